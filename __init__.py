@@ -14,8 +14,17 @@ You should have received a copy of the GNU General Public License
 along with it.  If not, see <http://www.gnu.org/licenses/>.
 """
 
-from Model.interface import PlayerMove
+try:
+    from Model.interface import PlayerMove
+except ImportError: #we're being run offline, without the real engine
+    from engine import PlayerMove
 from playerData import *
+from search import *
+from montecarlo import *
+from parallel import *
+from batch import *
+from time import time
+import sys
 
 """
 Cable Car: Student Computer Player
@@ -40,7 +49,25 @@ def init(playerId, numPlayers, startTile, logger, arg = "None"):
         numPlayers - the number of players in the game (1-6)
         startTile - the letter of your start tile (a-j)
         logger - and instance of the logger object
-        arg - an extra argument as specified via the config file (optional)
+        arg - an extra argument as specified via the config file (optional);
+            key=value settings, e.g. "search=expectimax depth=3 time=1.5"
+            or "search=mcts playouts=2000"; given a time (in seconds), each
+            move returns within it, and searches go on for as long as it
+            allows; given a number of workers, searches run in that many
+            processes, which are started here; "evaluator=batch" ranks
+            candidates all at once, more cheaply but without regard for
+            danger (and without checking the time, which it needs little
+            of); otherwise, given a time, candidates are evaluated most
+            promising first according to that ranking, so that running
+            out of time doesn't favor any part of the board;
+            "weights=20/-25/-15/-1/1" sets how much a move's enemy losses,
+            our losses, endangerment, enemy gains, and our gains count
+            toward its desirability; "profile" logs how long
+            each phase of each move (including the refresh of our stations
+            and legality at its start) takes and how many placement checks,
+            route dangers, and route traces (on the board and tile by tile)
+            it needs ("profile=FILE" writes them to FILE as JSON lines
+            instead), and sums it all up when the game is over
 
     You return:
         playerData - your player data, which is any data structure
@@ -51,10 +78,17 @@ def init(playerId, numPlayers, startTile, logger, arg = "None"):
     # Put your data in here.  
     # This will be permanently accessible by you in all functions.
     # It can be an object, list, or dictionary
-    playerData = PlayerData(logger, playerId, startTile, numPlayers)
+    playerData = PlayerData(logger, playerId, startTile, numPlayers, parseOptions(arg))
+    if playerData.options.get('search') in ('expectimax', 'mcts'): #only these searches have any use for workers
+        playerData.pool=startPool(int(playerData.options.get('workers', 1)))
+    if 'profile' in playerData.options:
+        playerData.profiler=Profiler(None if playerData.options['profile']=='True' else open(playerData.options['profile'], 'a'))
+        playerData.board.profiler=playerData.profiler
 
     #Our "constants":
     playerData.POWER_STATION_THRESHOLD=20
+    playerData.DEADLINE_MARGIN=0.1
+    playerData.MOVE_WEIGHTS=tuple(float(weight) for weight in playerData.options.get('weights', '20/-25/-15/-1/1').split('/'))
     
     #statistics collection:
     playerData.totalKills=0
@@ -77,10 +111,29 @@ def move(playerData):
             which contains whatever you need to keep track of
         playerMove - your next move
     """
+    if 'time' in playerData.options: #we've been given a budget for this move
+        budget=float(playerData.options['time'])
+        deadline=time()+budget
+        searchDeadline=deadline-min(RETURN_MARGIN, budget*playerData.DEADLINE_MARGIN) #leave ourselves time to make the move we settle on
+    else:
+        deadline=searchDeadline=None
+    
+    profiler=playerData.profiler
+    if profiler:
+        profiler.startMove()
+        profiler.enter('refresh')
+    
+    #keep watch on our progress and score; this can't wait for move_info(...), which won't hear from a player before us who's out of the game:
+    playerData.updateOurStations()
+    playerData.updateLegalConstraints()
+    
+    if profiler:
+        profiler.enter('firstTurn')
     if playerData.firstTurn():
         options = []
+        routes=playerData.board.traceAllRoutes()
         for track in range(1, 33):
-            if not playerData.board.routeIsComplete(track):
+            if not routes.complete[track-1]:
                 if playerData.trackOwner(track)!=playerData.playerId: #not our track
                     possibleFutures=playerData.possibleTrackExtensions(track, False) #look for edges
                     if possibleFutures: #we came up with an option
@@ -89,34 +142,86 @@ def move(playerData):
 #                            options+=possibleFutures
         if len(options):
             playerData.board.addTile(playerData.makeTile(playerData.currentTile, options[0][2]), options[0][0], options[0][1])
+            if profiler:
+                profiler.finishMove(playerData.logger)
             return playerData, PlayerMove(playerData.playerId, (options[0][0], options[0][1]), playerData.currentTile, options[0][2])
     
     #TODO end their longer tracks over their shorter ones, instead of just looking at the deltas?
     
-    unoccupiedCoordinates=[]
-    for row in range(8): #where are the vacancies on the board?
-        for column in range(8):
-            if not playerData.board.lookupTile(row, column): #there's nothing here
-                unoccupiedCoordinates.append((row, column))             
-                
-    validPlacements = []
-    for location in unoccupiedCoordinates: #attempt 2: put wherever it's valid
-        for rotation in range(4):
-            if playerData.mayMoveIllegally[playerData.playerId] or playerData.board.validPlacement(playerData.makeTile(rotation=rotation), location[0], location[1]):
-                validPlacements.append(PotentialMove(playerData,location[0],location[1],rotation))
+    if profiler:
+        profiler.enter('candidates')
+    unoccupiedCoordinates=[(space/8, space%8) for space in maskSpaces(playerData.board.emptyMask())] #where are the vacancies on the board?
     
-    validPlacements.sort(key=lambda choice: choice.enemyLosses*20+choice.ourLosses*-25+choice.deltaEndangerment*-15+choice.enemyGains*-1+choice.ourGains, reverse=True)
-    #print(validPlacements)
+    if playerData.mayMoveIllegally[playerData.playerId]: #attempt 2: put wherever it fits
+        candidates=[(location[0], location[1], rotation) for location in unoccupiedCoordinates for rotation in range(4)]
+    else: #put wherever it's valid
+        candidates=playerData.board.legalPlacements(playerData.currentTile)
     
-    #if we have a good choice, complete their longest route:
-    favoriteMove=validPlacements[0]
-    if favoriteMove.enemyLosses: #we're trying to hurt them
-        index=1
-        while index<len(validPlacements) and validPlacements[index].enemyLosses==favoriteMove.enemyLosses and validPlacements[index].ourLosses==favoriteMove.ourLosses and validPlacements[index].deltaEndangerment==favoriteMove.deltaEndangerment and validPlacements[index].ourGains==favoriteMove.ourGains: #we haven't hit anything that was unequal yet
-            if (validPlacements[index].row!=favoriteMove.row or validPlacements[index].column!=favoriteMove.column) and validPlacements[index].enemyGains>favoriteMove.enemyGains: #this is a different location than our favorite move's, and it gains more points for our enemy
-                favoriteMove=validPlacements[index]
-                #print 'I found a longer route!'
-            index+=1
+    if profiler:
+        profiler.enter('evaluation')
+    if playerData.options.get('evaluator')=='batch': #size them all up at once, albeit without regard for danger; this takes a small fraction of any sensible budget, so it doesn't watch the deadline
+        effects=evaluatePlacements(playerData, playerData.resolveTileName(playerData.currentTile), candidates)
+        if profiler:
+            profiler.enter('sorting')
+        ranking=effects.ranking(playerData.MOVE_WEIGHTS)
+        validPlacements=None
+        evaluations={}
+    else:
+        if deadline is not None: #we may not get through them all, so start with those the batch evaluator likes best instead of the top rows of the board
+            boardOrder=dict((placement, index) for index, placement in enumerate(candidates))
+            candidates=evaluatePlacements(playerData, playerData.resolveTileName(playerData.currentTile), candidates).ranking(playerData.MOVE_WEIGHTS)
+        validPlacements = []
+        for row, column, rotation in candidates:
+            validPlacements.append(PotentialMove(playerData, row, column, rotation))
+            if deadline is not None and time()>=searchDeadline: #make do with what we've seen so far
+                break
+        if deadline is not None: #put them back in board order, so that ties are broken just as they would be without a deadline
+            validPlacements.sort(key=lambda choice: boardOrder[(choice.row, choice.column, choice.rotation)])
+        
+        if profiler:
+            profiler.enter('sorting')
+        enemyLossWeight, ourLossWeight, endangermentWeight, enemyGainWeight, ourGainWeight=playerData.MOVE_WEIGHTS
+        validPlacements.sort(key=lambda choice: choice.enemyLosses*enemyLossWeight+choice.ourLosses*ourLossWeight+choice.deltaEndangerment*endangermentWeight+choice.enemyGains*enemyGainWeight+choice.ourGains*ourGainWeight, reverse=True)
+        #print(validPlacements)
+        ranking=[(choice.row, choice.column, choice.rotation) for choice in validPlacements]
+        evaluations=dict((placement, choice) for placement, choice in zip(ranking, validPlacements)) #so we needn't size up the move we settle on all over again
+    
+    if profiler:
+        profiler.enter('search' if playerData.options.get('search') in ('expectimax', 'mcts') else 'tieBreak')
+    if playerData.options.get('search')=='expectimax': #look ahead, breaking ties in favor of the above ranking
+        if deadline is not None and 'depth' not in playerData.options: #deepen for as long as we have time
+            depth=64
+        else:
+            depth=int(playerData.options.get('depth', 2))
+        if playerData.pool:
+            row, column, rotation=parallelExpectimax(playerData.pool, playerData, ranking, depth, deadline)
+        else:
+            row, column, rotation=ExpectimaxSearch(playerData, depth, searchDeadline).search(ranking)
+        favoriteMove=evaluations.get((row, column, rotation)) or PotentialMove(playerData, row, column, rotation)
+    elif playerData.options.get('search')=='mcts': #play it out, starting with the above ranking
+        if deadline is not None and 'playouts' not in playerData.options: #play out for as long as we have time
+            playouts=sys.maxint
+        else:
+            playouts=int(playerData.options.get('playouts', 1000))
+        if playerData.pool:
+            row, column, rotation=parallelMonteCarlo(playerData.pool, playerData, ranking, playouts, deadline)
+        else:
+            searcher=MonteCarloSearch(playerData.board.cells, playerData.playerId, playerData.numPlayers, playerData.stationOwners, playerData.upcomingTiles(), playerData.unseenTiles(), ranking)
+            searcher.run(playouts, searchDeadline)
+            playerData.logger.write('mcts: '+str(searcher.playouts)+' playouts')
+            row, column, rotation=searcher.bestMove() or ranking[0]
+        favoriteMove=evaluations.get((row, column, rotation)) or PotentialMove(playerData, row, column, rotation)
+    elif validPlacements is None: #take the top of the batch's ranking
+        favoriteMove=PotentialMove(playerData, *ranking[0])
+    else: #if we have a good choice, complete their longest route:
+        favoriteMove=validPlacements[0]
+        if favoriteMove.enemyLosses: #we're trying to hurt them
+            index=1
+            while index<len(validPlacements) and validPlacements[index].enemyLosses==favoriteMove.enemyLosses and validPlacements[index].ourLosses==favoriteMove.ourLosses and validPlacements[index].deltaEndangerment==favoriteMove.deltaEndangerment and validPlacements[index].ourGains==favoriteMove.ourGains: #we haven't hit anything that was unequal yet
+                if (validPlacements[index].row!=favoriteMove.row or validPlacements[index].column!=favoriteMove.column) and validPlacements[index].enemyGains>favoriteMove.enemyGains: #this is a different location than our favorite move's, and it gains more points for our enemy
+                    favoriteMove=validPlacements[index]
+                    #print 'I found a longer route!'
+                index+=1
     
     playerData.totalKills+=favoriteMove.enemyLosses
     playerData.totalHits+=favoriteMove.ourLosses
@@ -126,6 +231,8 @@ def move(playerData):
     playerData.ourGains+=favoriteMove.ourGains
     
     playerData.board.addTile(playerData.makeTile(rotation=favoriteMove.rotation), favoriteMove.row, favoriteMove.column)
+    if profiler:
+        profiler.finishMove(playerData.logger)
     return playerData, PlayerMove(playerData.playerId, (favoriteMove.row, favoriteMove.column), playerData.currentTile, favoriteMove.rotation)
 
 def move_info(playerData, playerMove, nextTile):
@@ -156,10 +263,6 @@ def move_info(playerData, playerMove, nextTile):
         playerData.board.addTile(playerData.makeTile(playerMove.tileName, playerMove.rotation), playerMove.position[0], playerMove.position[1]) #keep track of this tile's location
         playerData.opponentsTiles[playerMove.playerId]=nextTile #remember this player's next tile
     
-    if playerData.numPlayers==1 or (playerMove and playerMove.playerId==(playerData.playerId-1)%playerData.numPlayers): #we're either all alone or we'll be up next
-        playerData.updateOurStations() #keep watch on our progress and score
-        playerData.updateLegalConstraints()
-    
     return playerData
 
 ################################# PART ONE FUNCTIONS #######################
@@ -238,13 +341,21 @@ def game_over(playerData, historyFileName = None):
     print 'Times we left ourselves open: '+str(playerData.dangerousness)
     print 'Points we scored for our opponent: '+str(playerData.ourGift)
     print 'Points we claimed for ourselves: '+str(playerData.ourGains)
+    if playerData.profiler:
+        print playerData.profiler.summary()
+        if playerData.profiler.logFile is not None:
+            playerData.profiler.logFile.close()
+    
+    stopPool(playerData.pool) #our workers are no longer needed
+    playerData.pool=None
     
     '''playerScores=[0 for _ in range(playerData.numPlayers)]
+    routes=playerData.board.traceAllRoutes()
     for track in range(1, 33):
         owner=playerData.trackOwner(track)
         if owner!=-1:
-            playerScores[owner]+=playerData.board.calculateTrackScore(track)
-            #print 'track '+str(track)+' is worth '+str(playerData.board.calculateTrackScore(track))+' to player '+str(owner)
+            playerScores[owner]+=routes.score[track-1]
+            #print 'track '+str(track)+' is worth '+str(routes.score[track-1])+' to player '+str(owner)
     
     winners=[]
     for player in range(len(playerScores)):
@@ -0,0 +1,181 @@
+"""
+Copyright (C) 2011-12 Brad Bensch and Sol Boucher
+This is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with it.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+"""
+Cable Car: Student Computer Player
+
+Evaluates every candidate placement of a tile at once, working out how each would extend or complete the routes ending where it goes.  Rather than placing and removing tiles, we trace each route's continuation beyond every space next door just once; a placement's effect on a route is then the step through the new tile plus a lookup (or a few, if the route comes back through the new tile).  This uses NumPy if it's installed and plain Python otherwise, with the same results.
+Author: Solomon Boucher (slb1566@rit.edu)
+Author: Brad Bensch (brb7020@rit.edu)
+"""
+from playerData import *
+
+try:
+    import numpy
+except ImportError: #we'll do without
+    numpy=None
+
+class PlacementEffects(object):
+    __slots__=('candidates', 'ourLosses', 'enemyLosses', 'ourGains', 'enemyGains')
+    """
+    PlacementEffects: list(tuple(int, int, int)) * array(int) * array(int) * array(int) * array(int)
+    Summarizes the immediate effects of each of a list of placements; each member besides candidates is a NumPy array (or, without NumPy, a list) indexed like candidates
+        candidates - the (row, column, rotation) placements evaluated
+        ourLosses - how many of our routes each would complete
+        enemyLosses - how many of everyone else's routes each would complete
+        ourGains - how many points each would add to our routes
+        enemyGains - how many points each would add to everyone else's routes
+    NOTE: Unlike PotentialMove, these don't consider routes to be complete when they're merely cornered.
+    """
+    
+    def __init__(self, candidates, ourLosses, enemyLosses, ourGains, enemyGains):
+        """
+        __init__: list(tuple(int, int, int)) * array(int) * array(int) * array(int) * array(int) -> None
+        Creates a PlacementEffects from its members
+        """
+        self.candidates=candidates
+        self.ourLosses=ourLosses
+        self.enemyLosses=enemyLosses
+        self.ourGains=ourGains
+        self.enemyGains=enemyGains
+    
+    def ranking(self, weights):
+        """
+        ranking: tuple(float) -> list(tuple(int, int, int))
+        Returns the candidates from most to least desirable, those equally desirable remaining in their original order
+            weights - how much enemy losses, our losses, endangerment (which doesn't figure in here), enemy gains, and our gains count toward desirability, as in PlayerData.MOVE_WEIGHTS
+        """
+        enemyLossWeight, ourLossWeight, _, enemyGainWeight, ourGainWeight=weights
+        return [self.candidates[index] for index in sorted(range(len(self.candidates)), key=lambda index: self.enemyLosses[index]*enemyLossWeight+self.ourLosses[index]*ourLossWeight+self.enemyGains[index]*enemyGainWeight+self.ourGains[index]*ourGainWeight, reverse=True)]
+
+def evaluatePlacements(data, tileName, candidates):
+    """
+    evaluatePlacements: PlayerData * str * list(tuple(int, int, int)) -> PlacementEffects
+    Returns the effects of placing the specified tile at each of the specified empty spaces and rotations on our board
+        data - our PlayerData
+        tileName - the type of tile ('a'-'j')
+        candidates - the (row, column, rotation) placements to evaluate
+    pre: Each candidate's space is empty.
+    """
+    board=data.board
+    routes=board.traceAllRoutes() #this also brings stateRoutes up to date
+    
+    #trace onward from every state at which a route could emerge from one of the candidates:
+    continuations={}
+    for row, column, _ in candidates:
+        for side in range(4):
+            neighbor=NEIGHBORS[(row*8+column)*4+side]
+            if neighbor!=-1 and neighbor*4+(side+2)%4 not in continuations:
+                continuations[neighbor*4+(side+2)%4]=traceCells(board.cells, neighbor*4+(side+2)%4)
+    
+    if numpy is None:
+        return _evaluateSerially(data, routes, tileName, candidates, continuations)
+    else:
+        return _evaluateVectorized(data, routes, tileName, candidates, continuations)
+
+def _evaluateSerially(data, routes, tileName, candidates, continuations):
+    """
+    _evaluateSerially: PlayerData * RouteTable * str * list(tuple(int, int, int)) * dict(int, tuple(int, int, int)) -> PlacementEffects
+    Does the work of evaluatePlacements(...) one placement at a time
+        data - our PlayerData
+        routes - the current RouteTable
+        tileName - the type of tile ('a'-'j')
+        candidates - the (row, column, rotation) placements to evaluate
+        continuations - traceCells(...)'s result starting from each state at which a route could emerge from a candidate
+    """
+    effects=PlacementEffects(candidates, [], [], [], [])
+    for row, column, rotation in candidates:
+        space, code=row*8+column, tileCode(tileName, rotation)
+        ourLosses, enemyLosses, ourGains, enemyGains=0, 0, 0, 0
+        for side in range(4):
+            station=data.board.stateRoutes[space*4+side]
+            if station==-1: #no route ends here
+                continue
+            
+            entry, ending, length=side, ROUTE_LOOP, routes.length[station]
+            for _ in range(4): #a route can pass through the new tile at most once per side
+                exitSide=EXITS[code][entry]
+                length+=1
+                if NEIGHBORS[space*4+exitSide]==-1: #we're leaving the board
+                    ending=ROUTE_EDGE
+                    break
+                state, ending, extension=continuations[NEIGHBORS[space*4+exitSide]*4+(exitSide+2)%4]
+                length+=extension
+                if ending!=ROUTE_OPEN or state/4!=space: #we didn't come back to the new tile
+                    break
+                entry, ending=state%4, ROUTE_LOOP
+            
+            completed=ending==ROUTE_EDGE or ending==ROUTE_POWER
+            gain=length*(2 if ending==ROUTE_POWER else 1)-routes.score[station]
+            if data.trackOwner(station+1)==data.playerId:
+                ourLosses+=completed
+                ourGains+=gain
+            else:
+                enemyLosses+=completed
+                enemyGains+=gain
+        effects.ourLosses.append(ourLosses)
+        effects.enemyLosses.append(enemyLosses)
+        effects.ourGains.append(ourGains)
+        effects.enemyGains.append(enemyGains)
+    return effects
+
+def _evaluateVectorized(data, routes, tileName, candidates, continuations):
+    """
+    _evaluateVectorized: PlayerData * RouteTable * str * list(tuple(int, int, int)) * dict(int, tuple(int, int, int)) -> PlacementEffects
+    Does the work of evaluatePlacements(...) for every placement and side at once using NumPy arrays indexed by (candidate, side)
+        data - our PlayerData
+        routes - the current RouteTable
+        tileName - the type of tile ('a'-'j')
+        candidates - the (row, column, rotation) placements to evaluate
+        continuations - traceCells(...)'s result starting from each state at which a route could emerge from a candidate
+    """
+    finalStates=numpy.zeros(len(NEIGHBORS), dtype=int)
+    endings=numpy.zeros(len(NEIGHBORS), dtype=int)
+    extensions=numpy.zeros(len(NEIGHBORS), dtype=int)
+    for state, (finalState, ending, extension) in continuations.items():
+        finalStates[state], endings[state], extensions[state]=finalState, ending, extension
+    neighbors=numpy.array(NEIGHBORS)
+    exits=numpy.array(EXITS)
+    owners=numpy.array(data.stationOwners+[-1]) #so that index -1 (no route) belongs to no one
+    
+    spaces=numpy.array([row*8+column for row, column, _ in candidates], dtype=int)[:, numpy.newaxis]
+    codes=numpy.array([tileCode(tileName, rotation) for _, _, rotation in candidates], dtype=int)[:, numpy.newaxis]
+    stations=numpy.array(data.board.stateRoutes, dtype=int)[spaces*4+numpy.arange(4)]
+    entries=numpy.tile(numpy.arange(4), (len(candidates), 1))
+    ending=numpy.empty(stations.shape, dtype=int)
+    ending.fill(ROUTE_LOOP)
+    length=numpy.array(routes.length.tolist()+[0], dtype=int)[stations]
+    active=stations!=-1
+    for _ in range(4): #a route can pass through the new tile at most once per side
+        exitSides=exits[codes, entries]
+        neighbor=neighbors[spaces*4+exitSides]
+        length+=active
+        leaving=active&(neighbor==-1)
+        ending[leaving]=ROUTE_EDGE
+        active&=~leaving
+        
+        states=numpy.where(active, neighbor*4+(exitSides+2)%4, 0)
+        length+=numpy.where(active, extensions[states], 0)
+        returning=active&(endings[states]==ROUTE_OPEN)&(finalStates[states]//4==spaces)
+        finished=active&~returning
+        ending[finished]=endings[states][finished]
+        entries=numpy.where(returning, finalStates[states]%4, entries)
+        active=returning
+    
+    completed=(stations!=-1)&((ending==ROUTE_EDGE)|(ending==ROUTE_POWER))
+    gains=numpy.where(stations!=-1, numpy.where(ending==ROUTE_POWER, length*2, length)-numpy.array(routes.score.tolist()+[0], dtype=int)[stations], 0)
+    ours=owners[stations]==data.playerId
+    return PlacementEffects(candidates, (completed&ours).sum(1), (completed&~ours).sum(1), (gains*ours).sum(1), (gains*~ours).sum(1))
@@ -0,0 +1,192 @@
+"""
+Copyright (C) 2011-12 Brad Bensch and Sol Boucher
+This is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with it.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+"""
+Cable Car: Student Computer Player
+
+Micro-benchmarks of the board and player operations that matter most to our speed, run on positions taken from seeded self-play games early, midway, and late, for every number of players from two to six.  Each benchmark's results are written out as a line of JSON.  Run it from the directory containing the package, e.g.:
+    python -m GroupA.benchmark --output benchmarks.jsonl
+Author: Solomon Boucher (slb1566@rit.edu)
+Author: Brad Bensch (brb7020@rit.edu)
+"""
+from engine import *
+from argparse import ArgumentParser
+from copy import deepcopy
+from timeit import default_timer
+import json
+import os
+import sys
+
+PLAYER_PACKAGE=__name__.rpartition('.')[0] or __package__ #the package whose player we benchmark
+PHASES=(('early', 8), ('mid', 28), ('late', 48)) #the name of each fixture and the number of moves made before it
+MINIMUM_BATCH=0.001 #the fewest seconds a batch of calls may take, so that the timer's resolution doesn't matter
+MOVE_FIELDS=('ourRemainingStations', 'mayMoveIllegally', 'totalKills', 'totalHits', 'dangerousness', 'ourGift', 'ourGains') #what the player's move(...) changes besides the board
+
+def fixture(numPlayers, movesMade, seed=0):
+    """
+    fixture: int * int * int -> PlayerData
+    Returns the data of the player on move after the specified number of moves of a seeded self-play game
+        numPlayers - number of players in game (1-6)
+        movesMade - how many moves to play first
+        seed - the seed for the game's deck
+    """
+    player=__import__(PLAYER_PACKAGE)
+    chatter=sys.stdout
+    sys.stdout=open(os.devnull, 'w') #keep any of the players' chatter to ourselves
+    try:
+        result=playGame([player for _ in range(numPlayers)], seed, stopAfter=movesMade)
+    finally:
+        sys.stdout.close()
+        sys.stdout=chatter
+    return result.playerData[len(result.moves)%numPlayers]
+
+def benchmarks(data):
+    """
+    benchmarks: PlayerData -> list(tuple(str, function, function))
+    Returns the name, operation, and (if the operation disturbs the position) setup of each benchmark on the specified position.  Operations that take an argument cycle through every sensible one, one per call; setups run before every call, but aren't timed.  Like the player, the board's queries get to use whatever it has cached.
+        data - the data of the player on move
+    """
+    board=data.board
+    tileName=data.resolveTileName()
+    empty=[(space/8, space%8) for space in range(64) if board.cells[space]==EMPTY]
+    tiles=[(board.lookupTile(space/8, space%8), side) for space in range(64) if board.cells[space]>=0 for side in range(4)]
+    routes=board.traceAllRoutes()
+    openTracks=[track for track in range(1, 33) if not routes.complete[track-1] and routes.endSide[track-1]!=-1]
+    placement=(board.legalPlacements(tileName) or [(empty[0][0], empty[0][1], 0)])[0]
+    
+    def addAndRemove():
+        board.addTile(data.makeTile(tileName, placement[2]), placement[0], placement[1])
+        board.removeTile(placement[0], placement[1])
+    
+    player=sys.modules[PLAYER_PACKAGE]
+    lastMove=[None]
+    fixtureFields=[(field, deepcopy(getattr(data, field))) for field in MOVE_FIELDS]
+    def makeMove():
+        lastMove[0]=player.move(data)[1].position
+    
+    def undoMove():
+        if lastMove[0] is not None:
+            board.removeTile(*lastMove[0])
+            lastMove[0]=None
+        for field, value in fixtureFields: #so that every call starts from the fixture, not where the last one left off
+            setattr(data, field, deepcopy(value))
+    
+    return [('addTile+removeTile', addAndRemove, None),
+            ('validPlacement', _cycle(lambda row, column, rotation: board.validPlacement(data.makeTile(tileName, rotation), row, column), [(row, column, rotation) for row, column in empty for rotation in range(4)]), None),
+            ('followRoute', _cycle(board.followRoute, [(track,) for track in range(1, 33)]), None),
+            ('calculateTrackScore', _cycle(board.calculateTrackScore, [(track,) for track in range(1, 33)]), None),
+            ('routeIsComplete', _cycle(board.routeIsComplete, [(track,) for track in range(1, 33)]), None),
+            ('lookupTrackNumber', _cycle(board.lookupTrackNumber, tiles), None),
+            ('updateLegalConstraints', data.updateLegalConstraints, None),
+            ('routeInDanger', _cycle(data.routeInDanger, [(track,) for track in openTracks]), None),
+            ('move', makeMove, undoMove)]
+
+def _cycle(function, arguments):
+    """
+    _cycle: function * list(tuple) -> function
+    Returns an operation that calls the specified function with each of the specified argument lists in turn, one per call, starting over after the last; if there are none, it does nothing
+        function - what to call
+        arguments - the arguments for each call
+    """
+    position=[0]
+    def operation():
+        if arguments:
+            function(*arguments[position[0]])
+            position[0]=(position[0]+1)%len(arguments)
+    return operation
+
+def measure(operation, setup=None, samples=50):
+    """
+    measure: function * function * int -> list(float)
+    Returns how many seconds the specified operation took per call in each of the specified number of samples.  Without a setup, each sample is a batch of calls long enough for the timer to measure accurately; with one, it's a single call, after the setup.
+        operation - what to time
+        setup - what to do before each call, or None if nothing needs doing
+        samples - how many samples to take
+    """
+    calls=1
+    if setup is None: #find a batch size the timer can handle
+        while True:
+            started=default_timer()
+            for _ in xrange(calls):
+                operation()
+            if default_timer()-started>=MINIMUM_BATCH or calls>=1<<20:
+                break
+            calls*=2
+    
+    times=[]
+    for _ in range(samples):
+        if setup is not None:
+            setup()
+        started=default_timer()
+        for _ in xrange(calls):
+            operation()
+        times.append((default_timer()-started)/calls)
+    if setup is not None: #leave things as we found them
+        setup()
+    return times
+
+def summarize(times):
+    """
+    summarize: list(float) -> dict(str, float)
+    Returns the number of calls per second and the median, 90th, and 99th percentile times in microseconds of the specified per-call times
+        times - the seconds taken per call in each sample
+    """
+    ordered=sorted(times)
+    percentile=lambda fraction: round(ordered[min(int(fraction*len(ordered)), len(ordered)-1)]*1e6, 3)
+    return {'opsPerSecond':round(len(times)/sum(times), 1) if sum(times) else None, 'p50us':percentile(0.5), 'p90us':percentile(0.9), 'p99us':percentile(0.99), 'samples':len(times)}
+
+def runBenchmarks(output, playerCounts=range(2, 7), samples=50, seed=0, only=None):
+    """
+    runBenchmarks: file * list(int) * int * int * list(str)
+    Runs every benchmark on every fixture, writing each one's results to the specified file as a line of JSON
+        output - the file to which to write the results
+        playerCounts - the numbers of players for which to make fixtures
+        samples - how many samples to take of each benchmark
+        seed - the seed for the fixtures' games
+        only - the names of the benchmarks to run, or None to run them all
+    """
+    for numPlayers in playerCounts:
+        for phase, movesMade in PHASES:
+            data=fixture(numPlayers, movesMade, seed)
+            for name, operation, setup in benchmarks(data):
+                if only is None or name in only:
+                    record={'benchmark':name, 'players':numPlayers, 'phase':phase}
+                    record.update(summarize(measure(operation, setup, samples)))
+                    output.write(json.dumps(record, sort_keys=True, separators=(',', ':'))+'\n')
+                    output.flush()
+
+def main(arguments):
+    """
+    main: list(str)
+    Runs the benchmarks as specified on the command line
+        arguments - the command-line arguments, less the program name
+    """
+    parser=ArgumentParser(description='Time the board and player operations that matter most to our speed.')
+    parser.add_argument('--output', help='the file to which to write the results (default is standard output)')
+    parser.add_argument('--players', default='2,3,4,5,6', help='comma-separated numbers of players for which to make fixtures')
+    parser.add_argument('--samples', type=int, default=50, help='how many samples to take of each benchmark')
+    parser.add_argument('--seed', type=int, default=0, help='the seed for the fixtures\' games')
+    parser.add_argument('--only', action='append', help='the name of a benchmark to run; repeat for several (default is all of them)')
+    settings=parser.parse_args(arguments)
+    
+    if settings.output:
+        with open(settings.output, 'w') as output:
+            runBenchmarks(output, [int(count) for count in settings.players.split(',')], settings.samples, settings.seed, settings.only)
+    else:
+        runBenchmarks(sys.stdout, [int(count) for count in settings.players.split(',')], settings.samples, settings.seed, settings.only)
+
+if __name__=='__main__':
+    main(sys.argv[1:])
@@ -21,32 +21,144 @@ A fully-encapsulated system for keeping track of the board and its tiles.  The u
 Author: Solomon Boucher (slb1566@rit.edu)
 Author: Brad Bensch (brb7020@rit.edu)
 """
-from copy import deepcopy
+from array import array
+from random import Random
 
 class Board(object):
     """
-    Board: lst(lst(Tile)) * Cars
+    Board: lst(lst(Tile)) * Cars * array(int)
     Represents the board, the tiles on it, and the cable car stations around its perimeter
         board - a 2-D list of the placeable ConnectedTiles and fixed PowerStation tiles; allows random access
         cars - a Cars object representing the cable car stations; allows sequential route tracing
+        coordinates - the (row, column) location of each Tile on the board, keyed by the Tile itself; allows reverse lookup
+        cells - a flat, row-major array of the code of each space's occupant (EMPTY, POWER, or a tile code); allows fast route tracing
+        occupied - a bitboard (see maskSpaces(...)) of the spaces holding ConnectedTiles
+        legalRotations - a bitmask of the rotations in which each type of tile may legally be placed at each space, indexed by 64*(index of the type in TILE_TYPES)+space
+        legalSpaces - the number of spaces at which each type of tile may legally be placed, indexed by the type's index in TILE_TYPES
+        staleSpaces - the set of spaces whose entries in the above have been invalidated by placements or removals since they were last brought up to date
+        version - the number of times a ConnectedTile has been permanently placed or removed; any change to the board changes this
+        zobrist - the XOR of the ZOBRIST_KEYS of every ConnectedTile on the board; identifies the position independently of how it was reached
+        routes - a RouteTable summarizing the last trace of each station's route
+        routeTraces - the last traceCells(...) result for each station's route, along with a tuple of the states it visited, indexed by station *(0-31)*
+        spaceRoutes - a bitmask of the stations whose last traces visited each space, indexed by space
+        stateRoutes - the station *(0-31)* whose route passes through or ends at each state, or -1 if none does, indexed by state; current for all but the stale stations
+        staleRoutes - a bitmask of the stations whose last traces have been invalidated by placements or removals
+        routeUndo - a stack of (space, list(tuple(int, tuple))) entries recording, for each outstanding placement, the station traces it invalidated
+        undoLog - a stack of (row, column, Tile) entries recording, for each outstanding make(...), where it placed its tile and the placeholder it displaced
+        departures - the traceCells(...) result for a route leaving each empty space through each of its sides (None for a side on the edge of the board), or None if stale; indexed by space
+        departureSpaces - a bitmask of the spaces whose occupants each space's departures depend upon, indexed by space
+        spaceDepartures - a bitmask of the spaces whose departures depend upon each space's occupant, indexed by space
+        outcomes - the passThrough(...) result of each rotation of each type of tile for a route entering each empty space on each side, or None if not yet worked out; indexed by space, then 4*(index of the type in TILE_TYPES)+side; stale wherever departures are
+        dangers - the edge rotations, power rotations, and added lengths summarizing each of the above for routeDangers(...), or None if not yet worked out; indexed likewise
+        profiler - the Profiler counting our placement checks and route traces (tileTrace for walks from Tile to Tile, routeTrace for the rest), or None if no one is counting
     """
-    __slots__=('board', 'cars')
+    __slots__=('board', 'cars', 'coordinates', 'cells', 'occupied', 'legalRotations', 'legalSpaces', 'staleSpaces', 'version', 'zobrist', 'routes', 'routeTraces', 'spaceRoutes', 'stateRoutes', 'staleRoutes', 'routeUndo', 'undoLog', 'departures', 'departureSpaces', 'spaceDepartures', 'outcomes', 'dangers', 'profiler')
     
     def __init__(self):
         """
         __init__
         Constructs and returns an instance of Board
         """
-        self.cars=Cars()
+        self._setUp(array('b', [POWER if (space/8==3 or space/8==4) and (space%8==3 or space%8==4) else EMPTY for space in range(64)]))
+    
+    def _setUp(self, cells):
+        """
+        _setUp: array(int)
+        Fills in a board whose every space is as specified, with none of its caches worked out yet
+            cells - the code of each space's occupant, as in Board.cells; becomes our own
+        """
+        self.legalRotations=array('b', [0 for _ in range(len(TILE_TYPES)*64)])
+        self.legalSpaces=[0 for _ in TILE_TYPES]
+        self.staleSpaces=set(range(64))
+        self.version=0
+        self.routes=RouteTable()
+        self.routeTraces=[None for _ in range(32)]
+        self.spaceRoutes=[0 for _ in range(64)]
+        self.stateRoutes=array('b', [-1 for _ in range(256)])
+        self.staleRoutes=(1<<32)-1
+        self.routeUndo=[]
+        self.undoLog=[]
+        self.departures=[None for _ in range(64)]
+        self.departureSpaces=[0 for _ in range(64)]
+        self.spaceDepartures=[0 for _ in range(64)]
+        self.outcomes=[None for _ in range(64)]
+        self.dangers=[None for _ in range(64)]
+        self.profiler=None
         
+        #create every space's occupant:
+        self.cars=Cars()
         self.board=[[None for _ in range(8)] for _ in range(8)]
-        for row in range(len(self.board)):
-            for col in range(len(self.board[row])):
-                for _ in range(4):
-                    if (row==3 or row==4) and (col==3 or col==4):
-                        self.board[row][col]=PowerStation()
-                    else:
-                        self.addTile(Tile(), row, col)
+        self.coordinates={}
+        self.cells=cells
+        self.occupied=0
+        self.zobrist=0
+        for space in range(64):
+            if cells[space]==EMPTY:
+                resident=Tile()
+            elif cells[space]==POWER:
+                resident=PowerStation()
+            else:
+                resident=TILE_CLASSES[TILE_TYPES[cells[space]/4]](cells[space]%4)
+                self.zobrist^=ZOBRIST_KEYS[space*len(EXITS)+cells[space]]
+                self.occupied|=1<<space
+            self.board[space/8][space%8]=resident
+            self.coordinates[resident]=(space/8, space%8)
+        
+        #then link them all in a single pass:
+        for space in range(64):
+            resident=self.board[space/8][space%8]
+            for side in range(4):
+                neighbor=NEIGHBORS[space*4+side]
+                if neighbor==-1: #on the edge of the board
+                    self.cars.layTrack(resident, side, space%8 if side%2==0 else space/8)
+                elif isinstance(resident, ConnectedTile):
+                    resident.addBorderingTile(self.board[neighbor/8][neighbor%8], side, False)
+    
+    def snapshot(self):
+        """
+        snapshot: -> str
+        Returns the contents of the board packed into 64 bytes, one per space in row-major order, each holding the code of its occupant (as in Board.cells)
+        """
+        return self.cells.tostring()
+    
+    @staticmethod
+    def fromSnapshot(snapshot):
+        """
+        fromSnapshot: str -> Board
+        Returns a new board with the contents packed by snapshot()
+            snapshot - the packed contents
+        """
+        cells=array('b')
+        cells.fromstring(snapshot)
+        if len(cells)!=64 or [space for space in range(64) if cells[space]==POWER]!=[27, 28, 35, 36] or max(cells)>=len(EXITS) or min(cells)<POWER:
+            raise ValueError('not a board snapshot')
+        board=Board.__new__(Board)
+        board._setUp(cells)
+        return board
+    
+    def clone(self):
+        """
+        clone: -> Board
+        Returns a new board with the same tiles as this one, along with everything it has worked out about them, but none of its own Tile objects
+        NOTE: Any outstanding make(...)s are permanent on the clone, which can't unmake() them.
+        """
+        board=Board.__new__(Board)
+        board._setUp(array('b', self.cells))
+        board.legalRotations=array('b', self.legalRotations)
+        board.legalSpaces=list(self.legalSpaces)
+        board.staleSpaces=set(self.staleSpaces)
+        board.version=self.version
+        board.routes=self.routes.copy()
+        board.routeTraces=list(self.routeTraces)
+        board.spaceRoutes=list(self.spaceRoutes)
+        board.stateRoutes=array('b', self.stateRoutes)
+        board.staleRoutes=self.staleRoutes
+        board.departures=list(self.departures)
+        board.departureSpaces=list(self.departureSpaces)
+        board.spaceDepartures=list(self.spaceDepartures)
+        board.outcomes=[list(entries) if entries is not None else None for entries in self.outcomes]
+        board.dangers=[list(entries) if entries is not None else None for entries in self.dangers]
+        return board
     
     def _linkTileSide(self, newResident, neighboringRow, neighboringCol, side, makePermanent=True):
         """
@@ -81,7 +193,17 @@ class Board(object):
             return False
         
         if makePermanent:
+            if self.board[row][column] is not None: #forget the placeholder we're replacing
+                del self.coordinates[self.board[row][column]]
             self.board[row][column]=resident
+            self.coordinates[resident]=(row, column)
+            if isinstance(resident, ConnectedTile):
+                self.cells[row*8+column]=tileCode(resident.getType(), resident.getRotation())
+                self.zobrist^=ZOBRIST_KEYS[(row*8+column)*len(EXITS)+self.cells[row*8+column]]
+                self.occupied|=1<<(row*8+column)
+                self._invalidateLegality(row*8+column)
+                self._invalidateRoutes(row*8+column, True)
+                self._invalidateDangers(row*8+column)
         
         self._linkTileSide(resident, row-1, column, 0, makePermanent) #link with the above tile
         self._linkTileSide(resident, row, column+1, 1, makePermanent) #link with the right tile
@@ -97,17 +219,203 @@ class Board(object):
             column - the c-coordinate (0-7)
         post: The tile that has been removed is the same as if it had been passed into addTile(...) in order to create a temporary link.
         """
-        oldTile=self.board[row][column]
-        if not isinstance(oldTile, ConnectedTile): #this is part of the board
+        if not isinstance(self.board[row][column], ConnectedTile): #this is part of the board
+            return False
+        
+        self._vacate(row, column, Tile()) #replace with placeholder
+        return True
+    
+    def make(self, resident, row, column):
+        """
+        make: ConnectedTile * int * int -> bool
+        Tentatively places a tile on the board such that unmake() can later restore exactly the prior state, returning whether the operation succeeded (didn't clash with an existing tile).  Calls may be nested.
+            resident - the new tile to be placed
+            row - the r-coordinate (0-7)
+            column - the c-coordinate (0-7)
+        pre: This must be a valid move!
+        post: Iff this returns True, it must eventually be matched by a call to unmake(), in last-in, first-out order with respect to any other make(...)s.
+        """
+        placeholder=self.board[row][column]
+        if placeholder or not isinstance(resident, ConnectedTile): #there's already something there or this isn't a real tile!
             return False
         
-        self.board[row][column]=Tile() #replace with placeholder
-        self._linkTileSide(self.board[row][column], row-1, column, 0, True) #unlink from the above tile
-        self._linkTileSide(self.board[row][column], row, column+1, 1, True) #unlink from the right tile
-        self._linkTileSide(self.board[row][column], row+1, column, 2, True) #unlink from the below tile
-        self._linkTileSide(self.board[row][column], row, column-1, 3, True) #unlink from the left tile
+        self.addTile(resident, row, column)
+        self.undoLog.append((row, column, placeholder))
         return True
     
+    def unmake(self):
+        """
+        unmake: -> ConnectedTile
+        Takes back the most recent outstanding make(...), putting back the very placeholder it displaced, and returns the tile it had placed
+        pre: There is an outstanding make(...), and its tile hasn't since been removed.
+        """
+        row, column, placeholder=self.undoLog.pop()
+        resident=self.board[row][column]
+        self._vacate(row, column, placeholder)
+        return resident
+    
+    def _vacate(self, row, column, placeholder):
+        """
+        _vacate: int * int * Tile
+        Replaces the ConnectedTile at the specified coordinates with the specified placeholder, relinking its neighbors to the latter
+            row - the r-coordinate (0-7)
+            column - the c-coordinate (0-7)
+            placeholder - the empty Tile to leave in its stead
+        post: The tile that has been removed is the same as if it had been passed into addTile(...) in order to create a temporary link.
+        """
+        del self.coordinates[self.board[row][column]]
+        self.board[row][column]=placeholder
+        self.coordinates[placeholder]=(row, column)
+        self.zobrist^=ZOBRIST_KEYS[(row*8+column)*len(EXITS)+self.cells[row*8+column]]
+        self.cells[row*8+column]=EMPTY
+        self.occupied&=~(1<<(row*8+column))
+        self._invalidateLegality(row*8+column)
+        self._invalidateRoutes(row*8+column, False)
+        self._invalidateDangers(row*8+column)
+        self._linkTileSide(placeholder, row-1, column, 0, True) #unlink from the above tile
+        self._linkTileSide(placeholder, row, column+1, 1, True) #unlink from the right tile
+        self._linkTileSide(placeholder, row+1, column, 2, True) #unlink from the below tile
+        self._linkTileSide(placeholder, row, column-1, 3, True) #unlink from the left tile
+    
+    def _invalidateRoutes(self, space, placing):
+        """
+        _invalidateRoutes: int * bool
+        Marks stale the traces of all routes that pass through or end at the specified space, whose occupant has just changed.  A removal that undoes the most recent outstanding placement instead restores the traces that placement invalidated.
+            space - the row-major index of the space (0-63)
+            placing - whether a tile has just been placed here, as opposed to removed
+        """
+        self.version+=1
+        affected=self.spaceRoutes[space]
+        if placing: #remember the current traces so we can roll back cheaply
+            saved=[]
+            fresh=affected&~self.staleRoutes
+            while fresh: #for each station whose trace is affected and fresh
+                bit=fresh&-fresh
+                station=bit.bit_length()-1
+                saved.append((station, self.routeTraces[station]))
+                fresh^=bit
+            self.routeUndo.append((space, saved))
+            self.staleRoutes|=affected
+        elif self.routeUndo and self.routeUndo[-1][0]==space: #we're undoing the last placement
+            self.staleRoutes|=affected
+            for station, trace in self.routeUndo.pop()[1]:
+                self._fileRoute(station, trace)
+        else: #the saved traces no longer describe the board we'll return to
+            self.staleRoutes|=affected
+            self.routeUndo=[]
+    
+    def _fileRoute(self, station, trace):
+        """
+        _fileRoute: int * tuple(int, int, int, tuple(int))
+        Records a fresh trace of the specified station's route
+            station - the cable car station *(0-31)*
+            trace - the final state, ending, and length returned by traceCells(...), along with the states visited
+        """
+        bit=1<<station
+        if self.routeTraces[station]:
+            for state in self.routeTraces[station][3]:
+                self.spaceRoutes[state/4]&=~bit
+                if self.stateRoutes[state]==station: #we haven't already been superseded here
+                    self.stateRoutes[state]=-1
+        for state in trace[3]:
+            self.spaceRoutes[state/4]|=bit
+            self.stateRoutes[state]=station
+        
+        self.routeTraces[station]=trace
+        self.routes.record(station, trace[0], trace[1], trace[2])
+        self.staleRoutes&=~bit
+    
+    def _refreshRoute(self, station):
+        """
+        _refreshRoute: int
+        Retraces the specified station's route if its last trace is stale
+            station - the cable car station *(0-31)*
+        """
+        if (self.staleRoutes>>station)&1:
+            if self.profiler is not None:
+                self.profiler.count('routeTrace')
+            states=[]
+            state, ending, length=traceCells(self.cells, STATION_ENTRIES[station], states)
+            self._fileRoute(station, (state, ending, length, tuple(states)))
+    
+    def _refreshRoutes(self):
+        """
+        _refreshRoutes
+        Retraces every station's route whose last trace is stale
+        post: staleRoutes is 0.
+        """
+        while self.staleRoutes:
+            self._refreshRoute((self.staleRoutes&-self.staleRoutes).bit_length()-1)
+    
+    def _invalidateDangers(self, space):
+        """
+        _invalidateDangers: int
+        Marks stale the departures, outcomes, and dangers of every empty space whose departures depend upon the specified space, whose occupant has just changed
+            space - the row-major index of the space (0-63)
+        """
+        affected=self.spaceDepartures[space]
+        while affected: #for each space whose departures passed through this one
+            bit=affected&-affected
+            dependent=bit.bit_length()-1
+            affected^=bit
+            
+            dependencies=self.departureSpaces[dependent]
+            while dependencies: #it no longer depends on anything
+                other=dependencies&-dependencies
+                self.spaceDepartures[other.bit_length()-1]&=~bit
+                dependencies^=other
+            self.departureSpaces[dependent]=0
+            self.departures[dependent]=None
+            self.outcomes[dependent]=None
+            self.dangers[dependent]=None
+    
+    def _departures(self, space):
+        """
+        _departures: int -> tuple(tuple(int, int, int))
+        Returns the departures of the specified space, tracing them anew if they're stale
+            space - the row-major index of the space (0-63)
+        pre: The space is empty.
+        """
+        if self.departures[space] is None:
+            departures=[]
+            dependencies=0
+            for side in range(4):
+                neighbor=NEIGHBORS[space*4+side]
+                if neighbor==-1: #this side leads straight to a cable car station
+                    departures.append(None)
+                else:
+                    if self.profiler is not None:
+                        self.profiler.count('routeTrace')
+                    states=[]
+                    departures.append(traceCells(self.cells, neighbor*4+(side+2)%4, states))
+                    for state in states:
+                        dependencies|=1<<(state/4)
+            
+            self.departureSpaces[space]=dependencies
+            bit=1<<space
+            while dependencies:
+                other=dependencies&-dependencies
+                self.spaceDepartures[other.bit_length()-1]|=bit
+                dependencies^=other
+            self.departures[space]=tuple(departures)
+            self.outcomes[space]=[None for _ in range(len(TILE_TYPES)*4)]
+            self.dangers[space]=[None for _ in range(len(TILE_TYPES)*4)]
+        return self.departures[space]
+    
+    def _outcomes(self, state, tileName):
+        """
+        _outcomes: int * str -> tuple(tuple(int, int, int))
+        Returns the passThrough(...) result of each rotation of the specified type of tile for a route entering an empty space at the specified state, working them out if they aren't in the table
+            state - the state at which the route enters the space
+            tileName - the type of tile ('a'-'j')
+        pre: The space is empty.
+        """
+        space, index=state/4, TILE_TYPES.index(tileName)*4+state%4
+        departures=self._departures(space)
+        if self.outcomes[space][index] is None:
+            self.outcomes[space][index]=tuple(passThrough(departures, state, tileCode(tileName, rotation)) for rotation in range(4))
+        return self.outcomes[space][index]
+    
     def lookupTile(self, row, column, giveEmpty=False):
         """
         lookupTile: int * int -> ConnectedTile or None
@@ -143,10 +451,20 @@ class Board(object):
         Returns the coordinates at which the supplied tile is located, or None if it isn't located.
             tile - the Tile being sought
         """
-        for row in range(len(self.board)):
-            if tile in self.board[row]:
-                return row, self.board[row].index(tile)
-        return None
+        return self.coordinates.get(tile)
+    
+    def routeEndCoordinates(self, whichStation):
+        """
+        routeEndCoordinates: int -> tuple(int) or None
+        Returns the coordinates of the tile to which the route originating at the specified cable car station connects (those of followRoute(...)'s tile), or None if the route leaves the board.
+            whichStation - the cable car station (1-32)
+        """
+        self._refreshRoute(whichStation-1)
+        state, ending=self.routeTraces[whichStation-1][:2]
+        if ending==ROUTE_EDGE: #it ends at another station
+            return None
+        else:
+            return state/4/8, state/4%8
     
     def lookupTrackNumber(self, tile, side):
         """
@@ -156,11 +474,47 @@ class Board(object):
             side - the side of the next tile in the route (after the last one) to which the route connects (0-3)
         pre: tile must be on this board!
         """
-        result=self.cars.reverseFollowRoute(tile, side)+1
-        if not result: #invalid, meaning the route never touched the board's edge
+        coordinates=self.lookupTileCoordinates(tile)
+        if not coordinates: #not really on this board, so we'll have to follow its links
+            if self.profiler is not None:
+                self.profiler.count('tileTrace')
+            station=self.cars.reverseFollowRoute(tile, side)
+        elif isinstance(tile, ConnectedTile): #look up the route passing through it on its way out the specified side
+            self._refreshRoutes()
+            station=self.stateRoutes[(coordinates[0]*8+coordinates[1])*4+tile.internalConnections.index(tile.adjacentSide(side))]
+        else: #we were given a blank tile on the edge of the board
+            station=ENTRY_STATIONS[(coordinates[0]*8+coordinates[1])*4+side]
+        
+        if station==-1: #invalid, meaning the route never touched the board's edge
             return -1
         else:
-            return result
+            return station+1
+    
+    def traceRoute(self, whichStation):
+        """
+        traceRoute: int -> tuple(Tile, int, bool, int, int)
+        Follows the route originating at the specified cable car station in a single walk (unless it's unchanged since last time), returning the tile to which it connects, to which side of that tile it is linked, whether it's complete, how many tiles long it is, and its score.  An infinite loop in the route will cause a sentinel side value of -1, an incomplete status, and a sentinel score of -1.
+            whichStation - the cable car station (1-32)
+        """
+        self._refreshRoute(whichStation-1)
+        state, ending, length, _=self.routeTraces[whichStation-1]
+        space, side=state/4, state%4
+        if ending==ROUTE_EDGE: #the route left the board through the side of its last tile
+            return self.cars.stations[side], (side-2)%4, True, length, length
+        elif ending==ROUTE_POWER: #award the 2x bonus
+            return self.board[space/8][space%8], side, True, length, length*2
+        elif ending==ROUTE_OPEN:
+            return self.board[space/8][space%8], side, False, length, length
+        else:
+            return self.board[space/8][space%8], -1, False, length, -1
+    
+    def traceAllRoutes(self):
+        """
+        traceAllRoutes: -> RouteTable
+        Returns a summary of all 32 cable car stations' routes, retracing only those that have changed since they were last traced
+        """
+        self._refreshRoutes()
+        return self.routes.copy()
     
     def routeIsComplete(self, whichStation):
         """
@@ -168,23 +522,65 @@ class Board(object):
         Checks whether the route originating at the specified cable car station is actually connected to anything at the other end
             whichStation - the cable car station (1-32)
         """
-        return self.cars.routeComplete(whichStation-1)
+        return self.traceRoute(whichStation)[2]
     
     def calculateTrackScore(self, whichStation):
         """
         calculateTrackScore: int -> int
-        Returns the score of the route originating at the specified cable car station
+        Returns the score of the route originating at the specified cable car station.  An infinite loop in the route will cause a sentinel return value of -1.
             whichStation - the cable car station (1-32)
         """
-        return self.cars.calculateScore(whichStation-1)
+        return self.traceRoute(whichStation)[4]
     
     def followRoute(self, whichStation):
         """
         followRoute: int -> tuple(Tile, int)
-        Returns the tile to which this route connects and to which side of that tile it is linked
+        Returns the tile to which this route connects and to which side of that tile it is linked.  An infinite loop in the route will cause a sentinel side value of -1 to be returned.
+            whichStation - the cable car station (1-32)
+        """
+        return self.traceRoute(whichStation)[:2]
+    
+    def routeOutcomes(self, whichStation, tileName):
+        """
+        routeOutcomes: int * str -> tuple(tuple(int, int, int)) or None
+        Returns what traceCells(...) would, for the route originating at the specified cable car station, were each rotation of the specified type of tile placed at its end; that is, each rotation's final state, how the route would then end, and how many tiles long it would be.  Each answer is looked up in a table that is only reworked near where the board changes.  If the route doesn't end at an empty space, there's nowhere to put a tile, so None is returned.
             whichStation - the cable car station (1-32)
+            tileName - the type of tile ('a'-'j')
         """
-        return self.cars.followRoute(whichStation-1)
+        self._refreshRoute(whichStation-1)
+        state, ending, length, _=self.routeTraces[whichStation-1]
+        if ending!=ROUTE_OPEN: #there's nowhere to put a tile
+            return None
+        return tuple((finalState, passedEnding, length+passedLength) for finalState, passedEnding, passedLength in self._outcomes(state, tileName))
+    
+    def routeDangers(self, whichStation, tileName):
+        """
+        routeDangers: int * str -> tuple(int, int, tuple(int))
+        Returns bitmasks of the rotations in which the specified type of tile, placed at the end of the route originating at the specified cable car station, would carry it straight on to a cable car station and to a power station, respectively, along with how many tiles long the route would then be in each rotation.  These summarize routeOutcomes(...) and are tabulated alongside it.
+            whichStation - the cable car station (1-32)
+            tileName - the type of tile ('a'-'j')
+        NOTE: A route that doesn't end at an empty space is in no danger at all.
+        """
+        self._refreshRoute(whichStation-1)
+        state, ending, length, _=self.routeTraces[whichStation-1]
+        if ending!=ROUTE_OPEN: #there's nowhere to put a tile
+            return 0, 0, (length, length, length, length)
+        
+        space, index=state/4, TILE_TYPES.index(tileName)*4+state%4
+        outcomes=self._outcomes(state, tileName)
+        if self.dangers[space][index] is None: #sum up where each rotation would take the route
+            edgeRotations, powerRotations, added=0, 0, []
+            for rotation in range(4):
+                _, passedEnding, passedLength=outcomes[rotation]
+                if passedEnding==ROUTE_EDGE:
+                    edgeRotations|=1<<rotation
+                elif passedEnding==ROUTE_POWER:
+                    powerRotations|=1<<rotation
+                added.append(passedLength)
+            self.dangers[space][index]=(edgeRotations, powerRotations, tuple(added))
+        
+        edgeRotations, powerRotations, added=self.dangers[space][index]
+        return edgeRotations, powerRotations, tuple(length+extra for extra in added)
     
     def validPlacement(self, tile, row, column):
         """
@@ -194,19 +590,160 @@ class Board(object):
             row - isn't it obvious? (0-7)
             column - likewise (0-7)
         """
-        tile=deepcopy(tile)
-        if not self.addTile(tile, row, column, False): #location already occupied
-            return False
-        
-        atLeastOneOccupiedSide=False
-        for side in range(4):
-            neighbor=tile.neighborOnSide(side)
-            if isinstance(neighbor, OuterStations) and isinstance(tile.lookupDestination(neighbor), OuterStations): #this tile would "short out" this station
-                return False
-            elif isinstance(neighbor, OuterStations) or isinstance(neighbor, ConnectedTile): #this tile is connected to either an edge or a player-placed tile
-                atLeastOneOccupiedSide=True
-        
-        return atLeastOneOccupiedSide
+        return self.canPlace(tile.getType(), tile.getRotation(), row, column)
+    
+    def canPlace(self, tileName, rotation, row, column):
+        """
+        canPlace: str * int * int * int -> bool
+        Returns whether or not the specified type of tile may be placed at the proposed coordinates in the specified rotation.  Unlike validPlacement(...), this needs no ConnectedTile and leaves every tile untouched.
+            tileName - the type of tile ('a'-'j')
+            rotation - the tile's rotation (0-3)
+            row - the r-coordinate (0-7)
+            column - the c-coordinate (0-7)
+        """
+        if self.profiler is not None:
+            self.profiler.count('validPlacement')
+        space=row*8+column
+        if space in self.staleSpaces: #bring just this space up to date
+            self.staleSpaces.remove(space)
+            self._refreshLegality(space, self.frontierMask())
+        return (self.legalRotations[TILE_TYPES.index(tileName)*64+space]>>rotation)&1==1
+    
+    def legalPlacements(self, tileName):
+        """
+        legalPlacements: str -> list(tuple(int, int, int))
+        Returns every legal placement of the specified type of tile, in row-major order and then by rotation; the list is of the form (row, column, rotation)
+            tileName - the type of tile ('a'-'j')
+        """
+        self._updateLegality()
+        firstLegalRotations=TILE_TYPES.index(tileName)*64
+        placements=[]
+        for space in maskSpaces(self.frontierMask()):
+            legalRotations=self.legalRotations[firstLegalRotations+space]
+            for rotation in range(4):
+                if (legalRotations>>rotation)&1:
+                    placements.append((space/8, space%8, rotation))
+        return placements
+    
+    def emptyMask(self):
+        """
+        emptyMask: -> int
+        Returns a bitboard (see maskSpaces(...)) of the empty spaces
+        """
+        return FULL_MASK&~(self.occupied|POWER_MASK)
+    
+    def frontierMask(self):
+        """
+        frontierMask: -> int
+        Returns a bitboard (see maskSpaces(...)) of the empty spaces on the edge of the board or next to a ConnectedTile; that is, those where a tile may legally be placed
+        """
+        return self.emptyMask()&(EDGE_MASK|adjacentMask(self.occupied))
+    
+    def hasLegalPlacement(self, tileName):
+        """
+        hasLegalPlacement: str -> bool
+        Returns whether the specified type of tile may legally be placed anywhere at all
+            tileName - the type of tile ('a'-'j')
+        """
+        self._updateLegality()
+        return self.legalSpaces[TILE_TYPES.index(tileName)]>0
+    
+    def _invalidateLegality(self, space):
+        """
+        _invalidateLegality: int
+        Notes that the legality of placements at and around the specified space may have changed because its occupant did
+            space - the row-major index of the space (0-63)
+        """
+        self.staleSpaces.update(SURROUNDINGS[space])
+    
+    def _updateLegality(self):
+        """
+        _updateLegality
+        Brings legalRotations and legalSpaces up to date for each of the stale spaces
+        post: staleSpaces is empty.
+        """
+        if self.staleSpaces:
+            frontier=self.frontierMask()
+            while self.staleSpaces:
+                self._refreshLegality(self.staleSpaces.pop(), frontier)
+    
+    def _refreshLegality(self, space, frontier):
+        """
+        _refreshLegality: int * int
+        Brings legalRotations and legalSpaces up to date for the specified space
+            space - the row-major index of the space (0-63)
+            frontier - the current frontierMask()
+        """
+        onFrontier=(frontier>>space)&1==1
+        for typeIndex in range(len(TILE_TYPES)):
+            index=typeIndex*64+space
+            if onFrontier:
+                legalRotations=STATION_SAFE_ROTATIONS[index]
+            else:
+                legalRotations=0
+            
+            if legalRotations and not self.legalRotations[index]: #this space just became usable
+                self.legalSpaces[typeIndex]+=1
+            elif self.legalRotations[index] and not legalRotations: #this space just became unusable
+                self.legalSpaces[typeIndex]-=1
+            self.legalRotations[index]=legalRotations
+
+class RouteTable(object):
+    """
+    RouteTable: array(int) * array(int) * array(int) * array(int) * array(int) * array(int)
+    Summarizes the state of every cable car station's route; each member is indexed by station *(0-31)*
+        endSpace - the row-major index of the space where the route ends: the empty space or power station it enters, or the last tile if it reaches the edge
+        endSide - the side of that space at which the route ends: the side on which it enters, or the side through which it leaves the board; -1 if it loops infinitely
+        complete - 1 if the route is complete, 0 otherwise
+        powered - 1 if the route ends at a power station, 0 otherwise
+        length - the number of tiles in the route
+        score - the route's score, or -1 if it loops infinitely
+    """
+    __slots__=('endSpace', 'endSide', 'complete', 'powered', 'length', 'score')
+    
+    def __init__(self):
+        """
+        __init__
+        Constructs and returns an instance of RouteTable describing 32 empty routes
+        """
+        self.endSpace=array('b', [0 for _ in range(32)])
+        self.endSide=array('b', [0 for _ in range(32)])
+        self.complete=array('b', [0 for _ in range(32)])
+        self.powered=array('b', [0 for _ in range(32)])
+        self.length=array('h', [0 for _ in range(32)])
+        self.score=array('h', [0 for _ in range(32)])
+    
+    def record(self, station, state, ending, length):
+        """
+        record: int * int * int * int
+        Fills in the entries for one station from the results of tracing its route with traceCells(...)
+            station - the cable car station *(0-31)*
+            state - the state at which the route ends
+            ending - how the route ends (ROUTE_OPEN, ROUTE_EDGE, ROUTE_POWER, or ROUTE_LOOP)
+            length - the number of tiles in the route
+        """
+        self.endSpace[station]=state/4
+        self.endSide[station]=state%4
+        self.complete[station]=ending==ROUTE_EDGE or ending==ROUTE_POWER
+        self.powered[station]=ending==ROUTE_POWER
+        self.length[station]=length
+        if ending==ROUTE_POWER: #award the 2x bonus
+            self.score[station]=length*2
+        elif ending==ROUTE_LOOP:
+            self.endSide[station]=-1
+            self.score[station]=-1
+        else:
+            self.score[station]=length
+    
+    def copy(self):
+        """
+        copy: -> RouteTable
+        Returns an independent copy of this table
+        """
+        duplicate=RouteTable()
+        for member in self.__slots__:
+            setattr(duplicate, member, array(getattr(self, member).typecode, getattr(self, member)))
+        return duplicate
 
 class Cars(object):
     """
@@ -487,10 +1024,10 @@ class PowerStation(Tile):
 
 class ConnectedTile(Tile):
     """
-    ConnectedTile: * List(Tile) * List(int)
+    ConnectedTile: * List(Tile) * tuple(int)
     Represents one of the playable track pieces.
         borderingTiles - a list of the adjacent tiles (length 4)
-        internalConnections - a list of the tile-specific exit points for all entrance points (length 4)
+        internalConnections - a tuple of the tile-specific exit points for all entrance points, shared by every tile of the same type and rotation (length 4)
     """
     __slots__=('borderingTiles', 'internalConnections')
     
@@ -501,21 +1038,17 @@ class ConnectedTile(Tile):
         """
         Tile.__init__(self)
         self.borderingTiles=[None for _ in range(4)]
-        self.internalConnections=[]
+        self.internalConnections=()
     
-    def _rotate(self, connectionsTemplate, rotation):
+    def _rotate(self, rotation):
         """
-        _rotate: List(int) * int
+        _rotate: int
         Fixes a specific instance's connections, accounting for both the tile's type and its rotation
-            connectionsTemplate - the tile-specific internalConnections version for an unrotated instance (length 4)
             rotation - this instance's rotation (0-3)
-        pre: internalConnections is an empty list (length 0).
+        pre: type has already been set.
         """
         self.rotation=rotation
-        firstIndex=-rotation%len(connectionsTemplate) #start rotation indicies from the end
-        for oldIndex in range(firstIndex, len(connectionsTemplate))+range(firstIndex): #go from the calculated start to the list's end, then loop from the beginning
-            newIndex=len(self.internalConnections) #we'll be adding an index at the list's end
-            self.internalConnections.append((newIndex+connectionsTemplate[oldIndex]-oldIndex)%len(connectionsTemplate)) #cycle the *differences* between each index and its target
+        self.internalConnections=CONNECTIONS[self.type][rotation]
     
     def addBorderingTile(self, neighbor, side, mutualConnection=True):
         """
@@ -582,67 +1115,85 @@ class ConnectedTile(Tile):
         """
         return self.neighborOnSide(self._exitPoint(source))
     
-    def _loopingInfinitely(self, caller, visited):
+    def traceRoute(self, caller):
         """
-        _loopingInfinitely: (Tile or int) * list(ConnectedTile) -> bool
-        Determines whether a recursive function is looping infinitely along the same track
+        traceRoute: (Tile or int) -> tuple(Tile, int, bool, int, int)
+        Follows the route through this tile to its end in a single, iterative walk, returning the tile at which it ends, the side of that tile to which it connects, whether it's complete, how many tiles long it is, and its score.  An infinite loop in the route will cause the tile where it was detected to be returned along with a sentinel side value of -1, an incomplete status, and a sentinel score of -1.
+            caller - a reference to the Tile from which the route enters this one or the side of this tile on which it enters (0-3)
         """
-        if not isinstance(caller, Tile):
-            caller=self.neighborOnSide(caller)
+        if isinstance(caller, Tile):
+            entryPoint=self._entryPoint(caller)
+        else:
+            entryPoint=caller
         
-        for index in range(len(visited)):
-            if visited[index]==caller and index<len(visited)-1 and visited[index+1]==self: #this same leap has been made before in the same direction
-                return True
-        return False
+        tile, length=self, 0
+        visited=set() #(tile, entryPoint) pairs we've already passed through
+        while isinstance(tile, ConnectedTile):
+            if (tile, entryPoint) in visited: #this same leap has been made before in the same direction
+                return tile, -1, False, length, -1
+            visited.add((tile, entryPoint))
+            
+            exitPoint=tile.internalConnections[entryPoint]
+            tile, entryPoint=tile.borderingTiles[exitPoint], tile.adjacentSide(exitPoint)
+            length+=1
+        return tile, entryPoint, tile.routeComplete(None), length, tile.tabulateScore(None, length)
     
-    def routeComplete(self, caller, visited=[]):
+    def routeComplete(self, caller, _=None):
         """
-        routeComplete: (Tile or int) * list(ConnectedTile) -> bool
-        This helper method is used to determine whether each Tile represents the end of its track, and if so, it returns whether it represents an ending that leaves the track complete.  This override always recurses to the destination Tile's implementation of this method and returns the result of that call.
+        routeComplete: (Tile or int) * any -> bool
+        This helper method is used to determine whether each Tile represents the end of its track, and if so, it returns whether it represents an ending that leaves the track complete.  This override follows the route to its end and returns the result for the Tile found there.
             caller - a reference to the Tile that called this method or the side of this tile from where we entered (0-3)
+            _ - ignored (included for compatibility with sibling classes' implementations)
         """
-        if self._loopingInfinitely(caller, visited):
-            return False
-        else:
-            return self.lookupDestination(caller).routeComplete(self.adjacentSide(self._exitPoint(caller)), visited+[self])
+        return self.traceRoute(caller)[2]
     
-    def tabulateScore(self, caller, runningScore=0, visited=[]):
+    def tabulateScore(self, caller, runningScore=0, _=None):
         """
-        tabulateScore: (Tile or int) * int * list(ConnectedTile) -> int
-        This helper method is used to determine each track's total score.  This override always recurses to the destination Tile's implementation of this method, incrementing the score by 1, and returns the result of that call.  An infinite loop in the route will cause a sentinel return value of -1.
+        tabulateScore: (Tile or int) * int * any -> int
+        This helper method is used to determine each track's total score.  This override follows the route to its end, incrementing the score by 1 for each tile along the way, and returns the result for the Tile found there.  An infinite loop in the route will cause a sentinel return value of -1.
             caller - a reference to the Tile that called this method or the side of this tile from where we entered (0-3)
             runningScore - the running score
+            _ - ignored (included for compatibility with sibling classes' implementations)
         """
-        if self._loopingInfinitely(caller, visited):
+        endpoint, side, _, length, _=self.traceRoute(caller)
+        if side==-1:
             return -1
         else:
-            return self.lookupDestination(caller).tabulateScore(self.adjacentSide(self._exitPoint(caller)), runningScore+1, visited+[self])
+            return endpoint.tabulateScore(None, runningScore+length)
     
-    def followRoute(self, caller, visited=[]):
+    def followRoute(self, caller, _=None):
         """
-        followRoute: (Tile or int) * list(ConnectedTile) -> tuple(Tile, int)
-        This helper method is used to fetch the tile at the end of a track, as well as the side of this tile on which the rest of the track is.  This override recurses to the destination Tile's implementation and returns that method's result.  An infinite loop in the route will cause a sentinel side value of -1 to be returned.
-            entryPoint - a reference to the Tile that called this method or the side of this tile on which the track enters (0-3)
+        followRoute: (Tile or int) * any -> tuple(Tile, int)
+        This helper method is used to fetch the tile at the end of a track, as well as the side of this tile on which the rest of the track is.  This override follows the route to its end and returns that tile.  An infinite loop in the route will cause a sentinel side value of -1 to be returned.
+            caller - a reference to the Tile that called this method or the side of this tile on which the track enters (0-3)
+            _ - ignored (included for compatibility with sibling classes' implementations)
         """
-        if self._loopingInfinitely(caller, visited):
-            return self, -1
-        else:
-            return self.lookupDestination(caller).followRoute(self.adjacentSide(self._exitPoint(caller)), visited+[self])
+        return self.traceRoute(caller)[:2]
     
-    def reverseFollowRoute(self, caller, visited=[]):
+    def reverseFollowRoute(self, caller, _=None):
         """
-        reverseFollowRoute: (Tile or int) * list(ConnectedTile) -> tuple(Tile, int)
-        This method returns the tile from which the route of which this tile is a member originates, as well as the position where the route is attached.  An infinite loop in the route will cause a sentinel side value of -1 to be returned.
+        reverseFollowRoute: (Tile or int) * any -> tuple(Tile, int)
+        This method returns the tile from which the route of which this tile is a member originates, as well as the position where the route is attached.  The route is followed backwards iteratively.  An infinite loop in the route will cause a sentinel side value of -1 to be returned.
             caller - a reference to the *next* Tile in this route or the side of the *next* tile in the chain to which this one connects (0-3)
+            _ - ignored (included for compatibility with sibling classes' implementations)
         """
-        if self._loopingInfinitely(caller, visited):
-            return self, -1
-        elif isinstance(caller, Tile):
-            trackSide=self.internalConnections.index(self._entryPoint(caller)) #the side of *this* tile where the *preceding* tile is connected
+        if isinstance(caller, Tile):
+            exitPoint=self._entryPoint(caller) #the side of *this* tile where the *next* tile is connected
         else:
-            trackSide=self.internalConnections.index(self.adjacentSide(caller)) #the side of *this* tile where the *preceding* tile is connected
+            exitPoint=self.adjacentSide(caller) #the side of *this* tile where the *next* tile is connected
         
-        return self.neighborOnSide(trackSide).reverseFollowRoute(self, visited+[self])
+        tile=self
+        visited=set() #(tile, exitPoint) pairs we've already passed through
+        while True:
+            if (tile, exitPoint) in visited: #this same leap has been made before in the same direction
+                return tile, -1
+            visited.add((tile, exitPoint))
+            
+            trackSide=tile.internalConnections.index(exitPoint) #the side of *this* tile where the *preceding* tile is connected
+            preceding=tile.neighborOnSide(trackSide)
+            if not isinstance(preceding, ConnectedTile): #we've found where the route starts
+                return preceding.reverseFollowRoute(tile)
+            tile, exitPoint=preceding, tile.adjacentSide(trackSide)
     
     def __nonzero__(self):
         """
@@ -660,7 +1211,7 @@ class TileA(ConnectedTile):
         """
         ConnectedTile.__init__(self)
         self.type='a'
-        self._rotate([0, 3, 2, 1], rotation)
+        self._rotate(rotation)
 
 class TileB(ConnectedTile):
     def __init__(self, rotation):
@@ -671,7 +1222,7 @@ class TileB(ConnectedTile):
         """
         ConnectedTile.__init__(self)
         self.type='b'
-        self._rotate([1, 3, 0, 2], rotation)
+        self._rotate(rotation)
 
 class TileC(ConnectedTile):
     def __init__(self, rotation):
@@ -682,7 +1233,7 @@ class TileC(ConnectedTile):
         """
         ConnectedTile.__init__(self)
         self.type='c'
-        self._rotate([1, 2, 0, 3], rotation)
+        self._rotate(rotation)
 
 class TileD(ConnectedTile):
     def __init__(self, rotation):
@@ -693,7 +1244,7 @@ class TileD(ConnectedTile):
         """
         ConnectedTile.__init__(self)
         self.type='d'
-        self._rotate([0, 3, 1, 2], rotation)
+        self._rotate(rotation)
 
 class TileE(ConnectedTile):
     def __init__(self, rotation):
@@ -704,7 +1255,7 @@ class TileE(ConnectedTile):
         """
         ConnectedTile.__init__(self)
         self.type='e'
-        self._rotate([0, 1, 3, 2], rotation)
+        self._rotate(rotation)
 
 class TileF(ConnectedTile):
     def __init__(self, rotation):
@@ -715,7 +1266,7 @@ class TileF(ConnectedTile):
         """
         ConnectedTile.__init__(self)
         self.type='f'
-        self._rotate([2, 3, 0, 1], rotation)
+        self._rotate(rotation)
 
 class TileG(ConnectedTile):
     def __init__(self, rotation):
@@ -726,7 +1277,7 @@ class TileG(ConnectedTile):
         """
         ConnectedTile.__init__(self)
         self.type='g'
-        self._rotate([0, 1, 2, 3], rotation)
+        self._rotate(rotation)
 
 class TileH(ConnectedTile):
     def __init__(self, rotation):
@@ -737,7 +1288,7 @@ class TileH(ConnectedTile):
         """
         ConnectedTile.__init__(self)
         self.type='h'
-        self._rotate([3, 0, 1, 2], rotation)
+        self._rotate(rotation)
 
 class TileI(ConnectedTile):
     def __init__(self, rotation):
@@ -748,7 +1299,7 @@ class TileI(ConnectedTile):
         """
         ConnectedTile.__init__(self)
         self.type='i'
-        self._rotate([1, 2, 3, 0], rotation)
+        self._rotate(rotation)
 
 class TileJ(ConnectedTile):
     def __init__(self, rotation):
@@ -759,4 +1310,206 @@ class TileJ(ConnectedTile):
         """
         ConnectedTile.__init__(self)
         self.type='j'
-        self._rotate([3, 2, 1, 0], rotation)
+        self._rotate(rotation)
+
+######
+#These tables and functions support tracing routes using Board.cells, which encodes each space as an integer:
+#    EMPTY - nobody has placed a tile here yet
+#    POWER - one of the power stations
+#    0-39 - a ConnectedTile; its tile code is 4*(index of its type in TILE_TYPES)+(its rotation)
+#Positions along a route are encoded as *states*: 4*(row-major index of a space)+(side on which the route enters it)
+######
+TILE_TYPES='abcdefghij'
+TILE_COUNTS=(4, 16, 8, 8, 8, 4, 2, 2, 2, 6) #how many of each type are in the deck, indexed like TILE_TYPES
+EMPTY=-1
+POWER=-2
+
+#how traceCells(...) found a route to end:
+ROUTE_OPEN=0 #at an empty space
+ROUTE_EDGE=1 #at a cable car station
+ROUTE_POWER=2 #at a power station
+ROUTE_LOOP=3 #nowhere; it loops infinitely
+
+def tileCode(tileName, rotation):
+    """
+    tileCode: str * int -> int
+    Returns the code used to represent the specified tile in Board.cells
+        tileName - the type of tile ('a'-'j')
+        rotation - the tile's rotation (0-3)
+    """
+    return TILE_TYPES.index(tileName)*4+rotation
+
+def _rotateConnections(connectionsTemplate, rotation):
+    """
+    _rotateConnections: list(int) * int -> tuple(int)
+    Calculates a tile's internal connections, accounting for both the tile's type and its rotation
+        connectionsTemplate - the tile-specific internal connections for an unrotated instance (length 4)
+        rotation - the rotation (0-3)
+    """
+    connections=[]
+    firstIndex=-rotation%len(connectionsTemplate) #start rotation indicies from the end
+    for oldIndex in range(firstIndex, len(connectionsTemplate))+range(firstIndex): #go from the calculated start to the list's end, then loop from the beginning
+        newIndex=len(connections) #we'll be adding an index at the list's end
+        connections.append((newIndex+connectionsTemplate[oldIndex]-oldIndex)%len(connectionsTemplate)) #cycle the *differences* between each index and its target
+    return tuple(connections)
+
+#internal connections of each type of unrotated tile:
+_CONNECTION_TEMPLATES={'a':[0, 3, 2, 1], 'b':[1, 3, 0, 2], 'c':[1, 2, 0, 3], 'd':[0, 3, 1, 2], 'e':[0, 1, 3, 2],\
+                       'f':[2, 3, 0, 1], 'g':[0, 1, 2, 3], 'h':[3, 0, 1, 2], 'i':[1, 2, 3, 0], 'j':[3, 2, 1, 0]}
+
+#internal connections of every type of tile in every rotation, indexed by type, then rotation:
+CONNECTIONS=dict((tileName, tuple(_rotateConnections(_CONNECTION_TEMPLATES[tileName], rotation) for rotation in range(4))) for tileName in TILE_TYPES)
+
+#the ConnectedTile subclass representing each type of tile:
+TILE_CLASSES={'a':TileA, 'b':TileB, 'c':TileC, 'd':TileD, 'e':TileE, 'f':TileF, 'g':TileG, 'h':TileH, 'i':TileI, 'j':TileJ}
+
+#exit side for each side of entry, indexed by tile code:
+EXITS=tuple(CONNECTIONS[tileName][rotation] for tileName in TILE_TYPES for rotation in range(4))
+
+#random key for each tile code at each space, indexed by space*len(EXITS)+(tile code); fixed so that hashes are reproducible:
+_zobristSource=Random(1566)
+ZOBRIST_KEYS=tuple(int(_zobristSource.getrandbits(63)) for _ in range(64*len(EXITS)))
+del _zobristSource
+
+def _borderingSpace(space, side):
+    """
+    _borderingSpace: int * int -> int
+    Returns the row-major index of the space bordering the specified side of the specified space, or -1 if that side is on the edge of the board
+        space - the row-major index of the space (0-63)
+        side - the side of that space (0-3)
+    """
+    row, column=space/8+[-1, 0, 1, 0][side], space%8+[0, 1, 0, -1][side]
+    if row<0 or row>=8 or column<0 or column>=8:
+        return -1
+    else:
+        return row*8+column
+
+#space bordering each side of each space, or -1 at the edge of the board; indexed by state:
+NEIGHBORS=tuple(_borderingSpace(space, side) for space in range(64) for side in range(4))
+
+#each space along with those bordering it, indexed by space:
+SURROUNDINGS=tuple(tuple([space]+[NEIGHBORS[space*4+side] for side in range(4) if NEIGHBORS[space*4+side]!=-1]) for space in range(64))
+
+#bitboards of the whole board, its edge, its power stations, and its leftmost and rightmost columns:
+FULL_MASK=(1<<64)-1
+EDGE_MASK=sum(1<<space for space in range(64) if len(SURROUNDINGS[space])<5)
+POWER_MASK=sum(1<<space for space in (27, 28, 35, 36))
+LEFT_COLUMN_MASK=sum(1<<(row*8) for row in range(8))
+RIGHT_COLUMN_MASK=LEFT_COLUMN_MASK<<7
+
+#bitboard of the spaces bordering each space, indexed by space:
+NEIGHBOR_MASKS=tuple(sum(1<<neighbor for neighbor in SURROUNDINGS[space][1:]) for space in range(64))
+
+def maskSpaces(mask):
+    """
+    maskSpaces: int -> list(int)
+    Returns the spaces in the specified bitboard, in ascending order
+        mask - the bitboard: an integer whose bit n is set iff it contains the space with row-major index n
+    """
+    spaces=[]
+    while mask:
+        lowest=mask&-mask
+        spaces.append(lowest.bit_length()-1)
+        mask^=lowest
+    return spaces
+
+def adjacentMask(mask):
+    """
+    adjacentMask: int -> int
+    Returns a bitboard (see maskSpaces(...)) of the spaces bordering any of those in the specified one
+        mask - the bitboard
+    """
+    return ((mask<<8)|(mask>>8)|((mask&~RIGHT_COLUMN_MASK)<<1)|((mask&~LEFT_COLUMN_MASK)>>1))&FULL_MASK
+
+def _stationSafeRotations(tileName, space):
+    """
+    _stationSafeRotations: str * int -> int
+    Returns a bitmask of the rotations in which the specified tile wouldn't "short out" a cable car station by routing it straight back to the edge if placed at the specified space; bit r is set iff rotation r is safe
+        tileName - the type of tile ('a'-'j')
+        space - the row-major index of the space (0-63)
+    """
+    safeRotations=0
+    for rotation in range(4):
+        safe=True
+        for side in range(4):
+            if NEIGHBORS[space*4+side]==-1 and NEIGHBORS[space*4+CONNECTIONS[tileName][rotation][side]]==-1: #route from this station leads right back to the edge
+                safe=False
+        if safe:
+            safeRotations|=1<<rotation
+    return safeRotations
+
+#station-safe rotations of each type of tile at each space, indexed by 64*(index of the type in TILE_TYPES)+space:
+STATION_SAFE_ROTATIONS=tuple(_stationSafeRotations(tileName, space) for tileName in TILE_TYPES for space in range(64))
+
+#state at which each cable car station's route enters the board, indexed by station *(0-31)*:
+STATION_ENTRIES=tuple([column*4+0 for column in range(8)]+\
+                      [(row*8+7)*4+1 for row in range(8)]+\
+                      [(56+7-column)*4+2 for column in range(8)]+\
+                      [((7-row)*8)*4+3 for row in range(8)])
+
+#cable car station *(0-31)* whose route enters the board at each state, or -1 if none does, indexed by state:
+ENTRY_STATIONS=tuple(STATION_ENTRIES.index(state) if state in STATION_ENTRIES else -1 for state in range(len(NEIGHBORS)))
+
+def traceCells(cells, state, states=None):
+    """
+    traceCells: array(int) * int * list(int) -> tuple(int, int, int)
+    Follows a route across a flat board from the specified state, returning the final state, how the route ends (ROUTE_OPEN, ROUTE_EDGE, ROUTE_POWER, or ROUTE_LOOP), and how many tiles it crossed.  The final state is that at which the route enters its empty space or power station or, if it leaves the board, its last tile and the side through which it does so.
+        cells - the flat board (length 64)
+        state - the state at which to start
+        states - a list to which to append each state the route visits (including that where it enters an empty space or power station), or None not to bother
+    """
+    length=0
+    for _ in range(len(NEIGHBORS)): #no route can visit more states than exist
+        if states is not None:
+            states.append(state)
+        code=cells[state/4]
+        if code==EMPTY:
+            return state, ROUTE_OPEN, length
+        elif code==POWER:
+            return state, ROUTE_POWER, length
+        
+        exitSide=EXITS[code][state%4]
+        length+=1
+        neighbor=NEIGHBORS[state-state%4+exitSide]
+        if neighbor==-1: #we're leaving the board
+            return state-state%4+exitSide, ROUTE_EDGE, length
+        state=neighbor*4+(exitSide+2)%4
+    return state, ROUTE_LOOP, length
+
+def passThrough(departures, state, code):
+    """
+    passThrough: tuple(tuple(int, int, int)) * int * int -> tuple(int, int, int)
+    Returns what traceCells(...) would, starting from the specified state at an empty space, were the specified tile placed there.  The route may come back through the new tile, but it is otherwise followed by way of the space's departures.
+        departures - the traceCells(...) result for a route leaving the space through each of its sides, or None for a side on the edge of the board (as in Board.departures)
+        state - the state at which the route enters the space
+        code - the code of the tile placed there
+    """
+    space, entry, length=state/4, state%4, 0
+    for _ in range(4): #a route can pass through the new tile at most once per side
+        exitSide=EXITS[code][entry]
+        length+=1
+        if departures[exitSide] is None: #we're leaving the board
+            return space*4+exitSide, ROUTE_EDGE, length
+        finalState, ending, extension=departures[exitSide]
+        length+=extension
+        if ending!=ROUTE_OPEN or finalState/4!=space: #we didn't come back to the new tile
+            return finalState, ending, length
+        entry=finalState%4
+    return state, ROUTE_LOOP, length
+
+def scoreCells(cells):
+    """
+    scoreCells: array(int) -> list(int)
+    Returns the score of each cable car station's route across a flat board, indexed by station *(0-31)*; routes that loop infinitely score nothing
+        cells - the flat board (length 64)
+    """
+    scores=[]
+    for entry in STATION_ENTRIES:
+        _, ending, length=traceCells(cells, entry)
+        if ending==ROUTE_POWER: #award the 2x bonus
+            scores.append(length*2)
+        elif ending==ROUTE_LOOP:
+            scores.append(0)
+        else:
+            scores.append(length)
+    return scores
@@ -0,0 +1,176 @@
+"""
+Copyright (C) 2011-12 Brad Bensch and Sol Boucher
+This is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with it.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+"""
+Cable Car: Student Computer Player
+
+A bare-bones stand-in for the course's game engine, for running games offline: it deals from a seeded deck, drives each player through init(...), move(...), move_info(...), and game_over(...), kicks out anyone who makes an illegal move, and scores the result.  There's no GUI and nothing is logged, so many games can be played in a single process.
+Author: Solomon Boucher (slb1566@rit.edu)
+Author: Brad Bensch (brb7020@rit.edu)
+"""
+from playerData import *
+from random import Random
+from time import time
+
+class PlayerMove(object):
+    __slots__=('playerId', 'position', 'tileName', 'rotation')
+    """
+    PlayerMove: int * tuple(int, int) * str * int
+    Stands in for the engine's Model.interface.PlayerMove when it isn't available
+        playerId - the ID of the player making the move (0-5)
+        position - the (row, column) at which the tile is placed
+        tileName - the type of tile ('a'-'j')
+        rotation - the tile's rotation (0-3)
+    """
+    
+    def __init__(self, playerId, position, tileName, rotation):
+        """
+        __init__: int * tuple(int, int) * str * int -> None
+        Creates a PlayerMove from its members
+        """
+        self.playerId=playerId
+        self.position=position
+        self.tileName=tileName
+        self.rotation=rotation
+    
+    def __repr__(self):
+        """
+        __repr__ -> str
+        Returns a string representation of this thing
+        """
+        return 'PlayerMove('+str(self.playerId)+', '+str(self.position)+', '+repr(self.tileName)+', '+str(self.rotation)+')'
+
+class QuietLogger(object):
+    """
+    QuietLogger
+    Stands in for the engine's logger wherever there's no use for one
+    """
+    
+    def write(self, message):
+        """
+        write: str
+        Discards the provided message
+            message - what would have been logged
+        """
+        pass
+
+class GameResult(object):
+    __slots__=('scores', 'eliminated', 'moves', 'moveTimes', 'playerData')
+    """
+    GameResult: list(int) * list(bool) * list(PlayerMove) * list(list(float)) * list(object)
+    Records how a game went
+        scores - each player's final score, indexed by player ID
+        eliminated - whether each player was kicked out for making an illegal move, indexed by player ID
+        moves - every move that made it onto the board, in order
+        moveTimes - how many seconds each of each player's calls to move(...) took, in order (including any illegal move); indexed by player ID
+        playerData - each player's data as of the end of the game, indexed by player ID
+    """
+    
+    def __init__(self, numPlayers):
+        """
+        __init__: int -> None
+        Creates an empty GameResult for a game with the specified number of players
+            numPlayers - number of players in game (1-6)
+        """
+        self.scores=[0 for _ in range(numPlayers)]
+        self.eliminated=[False for _ in range(numPlayers)]
+        self.moves=[]
+        self.moveTimes=[[] for _ in range(numPlayers)]
+        self.playerData=[None for _ in range(numPlayers)]
+
+def shuffledDeck(seed=None):
+    """
+    shuffledDeck: object -> list(str)
+    Returns the full deck of tiles, shuffled and ready to be drawn from the end
+        seed - the seed for the shuffle, or None to pick one arbitrarily
+    """
+    deck=[TILE_TYPES[index] for index in range(len(TILE_TYPES)) for _ in range(TILE_COUNTS[index])]
+    Random(seed).shuffle(deck)
+    return deck
+
+def playGame(players, seed=None, args=None, stopAfter=None):
+    """
+    playGame: list(module) * object * list(str) * int -> GameResult
+    Plays a game between the specified players and returns how it went.  A player who makes an illegal move is kicked out: his move isn't played, and he's told nothing more until the game is over.  Since his tile never reaches the board, the deck may run out first; the game then ends once no one left in it holds a tile.
+        players - the player implementing the engine protocol in each seat, indexed by player ID (1-6 of them; the same one may appear more than once)
+        seed - the seed for shuffling the deck, or None to pick one arbitrarily
+        args - the extra argument with which to initialize the player in each seat, indexed by player ID, or None to pass none at all
+        stopAfter - the number of moves after which to break off the game, leaving it unscored and the players none the wiser, or None to play it out
+    """
+    numPlayers=len(players)
+    deck=shuffledDeck(seed)
+    board=Board()
+    result=GameResult(numPlayers)
+    
+    hands=[deck.pop() for _ in range(numPlayers)]
+    for player in range(numPlayers):
+        if args is None:
+            result.playerData[player]=players[player].init(player, numPlayers, hands[player], QuietLogger())
+        else:
+            result.playerData[player]=players[player].init(player, numPlayers, hands[player], QuietLogger(), args[player])
+    
+    player=0
+    while EMPTY in board.cells and any(hands[seat] is not None and not result.eliminated[seat] for seat in range(numPlayers)):
+        if stopAfter is not None and len(result.moves)>=stopAfter: #that's far enough
+            return result
+        if result.eliminated[player] or hands[player] is None: #he's out of the game or has nothing left to place
+            player=(player+1)%numPlayers
+            continue
+        
+        started=time()
+        result.playerData[player], playerMove=players[player].move(result.playerData[player])
+        result.moveTimes[player].append(time()-started)
+        if not legalMove(board, player, hands[player], playerMove): #he's out
+            result.eliminated[player]=True
+            player=(player+1)%numPlayers
+            continue
+        
+        row, column=playerMove.position
+        board.addTile(TILE_CLASSES[playerMove.tileName](playerMove.rotation), row, column)
+        result.moves.append(PlayerMove(player, (row, column), playerMove.tileName, playerMove.rotation))
+        if deck:
+            hands[player]=deck.pop()
+        else:
+            hands[player]=None
+        for watcher in range(numPlayers):
+            if not result.eliminated[watcher]:
+                result.playerData[watcher]=players[watcher].move_info(result.playerData[watcher], None if watcher==player else result.moves[-1], hands[player])
+        player=(player+1)%numPlayers
+    
+    routes=board.traceAllRoutes()
+    owners=STATION_OWNERS[numPlayers]
+    for station in range(len(owners)):
+        if owners[station]!=-1:
+            result.scores[owners[station]]+=max(routes.score[station], 0)
+    for player in range(numPlayers):
+        players[player].game_over(result.playerData[player])
+    return result
+
+def legalMove(board, playerId, tileName, playerMove):
+    """
+    legalMove: Board * int * str * PlayerMove -> bool
+    Returns whether the specified move is one that the specified player may make: he must place the tile in his hand on an empty space, legally unless there's no legal placement for it anywhere
+        board - the board as it stands
+        playerId - the ID of the player on move (0-5)
+        tileName - the type of tile in his hand ('a'-'j')
+        playerMove - the move he's made
+    """
+    if playerMove is None or playerMove.playerId!=playerId or playerMove.tileName!=tileName or playerMove.rotation not in range(4):
+        return False
+    row, column=playerMove.position
+    if row not in range(8) or column not in range(8) or board.cells[row*8+column]!=EMPTY: #there's no room for it
+        return False
+    return board.canPlace(tileName, playerMove.rotation, row, column) or not board.hasLegalPlacement(tileName)
@@ -0,0 +1,131 @@
+"""
+Copyright (C) 2011-12 Brad Bensch and Sol Boucher
+This is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with it.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+"""
+Cable Car: Student Computer Player
+
+A compact binary format for whole games, and a reader that replays them onto a Board or into a PlayerData without any engine.  A record file begins with RECORD_MAGIC and holds any number of games, one after another.  Each game is a byte for the number of players and a byte for the number of moves, followed by two little-endian bytes per move:
+    bits 0-5: the row-major index of the space (0-63)
+    bits 6-9: the index of the tile's type in TILE_TYPES (0-9)
+    bits 10-11: the tile's rotation (0-3)
+    bits 12-14: the ID of the player who placed it (0-5)
+Author: Solomon Boucher (slb1566@rit.edu)
+Author: Brad Bensch (brb7020@rit.edu)
+"""
+from engine import *
+from struct import Struct
+
+RECORD_MAGIC='CCR1' #identifies a file of game records
+_HEADER=Struct('<BB') #number of players, number of moves
+_MOVE=Struct('<H') #one encoded move
+
+def encodeMove(playerMove):
+    """
+    encodeMove: PlayerMove -> int
+    Returns the specified move packed into sixteen bits
+        playerMove - the move
+    """
+    row, column=playerMove.position
+    return (row*8+column)|TILE_TYPES.index(playerMove.tileName)<<6|playerMove.rotation<<10|playerMove.playerId<<12
+
+def decodeMove(code):
+    """
+    decodeMove: int -> PlayerMove
+    Returns the move packed into the specified sixteen bits by encodeMove(...)
+        code - the packed move
+    """
+    return PlayerMove(code>>12&7, ((code&63)/8, (code&63)%8), TILE_TYPES[code>>6&15], code>>10&3)
+
+def startRecord(output):
+    """
+    startRecord: file
+    Begins a file of game records
+        output - the file, opened for writing in binary mode
+    """
+    output.write(RECORD_MAGIC)
+
+def writeGame(output, numPlayers, moves):
+    """
+    writeGame: file * int * list(PlayerMove)
+    Appends a game to a file of game records
+        output - the file, as begun by startRecord(...)
+        numPlayers - number of players in game (1-6)
+        moves - every move that made it onto the board, in order (as in GameResult.moves)
+    """
+    output.write(_HEADER.pack(numPlayers, len(moves))+''.join(_MOVE.pack(encodeMove(playerMove)) for playerMove in moves))
+
+def readGames(source):
+    """
+    readGames: file -> generator(tuple(int, list(PlayerMove)))
+    Yields the number of players in and moves of each game in a file of game records, one game at a time
+        source - the file, opened for reading in binary mode
+    pre: The file begins with RECORD_MAGIC.
+    """
+    if source.read(len(RECORD_MAGIC))!=RECORD_MAGIC:
+        raise ValueError('not a file of game records')
+    while True:
+        header=source.read(_HEADER.size)
+        if len(header)<_HEADER.size: #that's all of them
+            return
+        numPlayers, moveCount=_HEADER.unpack(header)
+        body=source.read(moveCount*_MOVE.size)
+        yield numPlayers, [decodeMove(_MOVE.unpack_from(body, index*_MOVE.size)[0]) for index in range(moveCount)]
+
+def replayBoard(moves, board=None):
+    """
+    replayBoard: list(PlayerMove) * Board -> Board
+    Places the specified moves' tiles on a board, returning it
+        moves - the moves to replay, in order
+        board - the board on which to place them, or None for a new one
+    """
+    if board is None:
+        board=Board()
+    for playerMove in moves:
+        if not board.addTile(TILE_CLASSES[playerMove.tileName](playerMove.rotation), playerMove.position[0], playerMove.position[1]): #the record doesn't match the board
+            raise ValueError('move onto an occupied space: '+repr(playerMove))
+    return board
+
+def replayTurns(numPlayers, moves, playerId):
+    """
+    replayTurns: int * list(PlayerMove) * int -> generator(tuple(PlayerData, PlayerMove))
+    Replays a game from the specified player's point of view, yielding his PlayerData whenever it's his turn, just as move(...) would have received it, along with the move he actually made.  Each PlayerData is new and has its own clone of the board, so the caller may do as he likes with it (move(...) included) without disturbing the replay.
+        numPlayers - number of players in game (1-6)
+        moves - every move that made it onto the board, in order
+        playerId - the player whose turns to replay (0-5)
+    NOTE: Like any PlayerData, the one yielded has no POWER_STATION_THRESHOLD, MOVE_WEIGHTS, or statistics until the caller sets them, as init(...) would.
+    """
+    #the tile each move's player places next, or None if that was his last:
+    nextTiles=[None for _ in moves]
+    upcoming=[None for _ in range(numPlayers)]
+    for index in reversed(range(len(moves))):
+        nextTiles[index]=upcoming[moves[index].playerId]
+        upcoming[moves[index].playerId]=moves[index].tileName
+    
+    board=Board()
+    opponentsTiles=['' for _ in range(numPlayers)]
+    for index in range(len(moves)):
+        playerMove=moves[index]
+        if playerMove.playerId==playerId: #our turn
+            data=PlayerData(QuietLogger(), playerId, playerMove.tileName, numPlayers)
+            data.board=board.clone()
+            data.opponentsTiles=list(opponentsTiles)
+            data.updateOurStations()
+            data.updateLegalConstraints()
+            yield data, playerMove
+            opponentsTiles=['' for _ in range(numPlayers)] #it's a new round
+        else: #we learn what he'll place next
+            opponentsTiles[playerMove.playerId]=nextTiles[index]
+        replayBoard([playerMove], board)
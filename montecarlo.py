@@ -0,0 +1,300 @@
+"""
+Copyright (C) 2011-12 Brad Bensch and Sol Boucher
+This is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with it.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+"""
+Cable Car: Student Computer Player
+
+A Monte Carlo tree search (UCT) over the moves whose tiles we know, finished off by random playouts on a flat copy of the board.  Everything here works on plain Board.cells arrays rather than Tile objects so that a search can be shipped to another process.
+Author: Solomon Boucher (slb1566@rit.edu)
+Author: Brad Bensch (brb7020@rit.edu)
+"""
+from board import *
+from array import array
+from math import log, sqrt
+from random import Random
+from time import time
+
+EXPLORATION=0.7 #UCB1 exploration constant; rewards lie between 0 and 1
+MARGIN=60.0 #a lead of half this many points is as good as it gets
+
+class MonteCarloSearch(object):
+    __slots__=('cells', 'playerId', 'numPlayers', 'owners', 'tiles', 'deck', 'random', 'root', 'playouts')
+    """
+    MonteCarloSearch: array(int) * int * int * list(int) * list(int) * list(int) * Random * MonteCarloNode * int
+    Grows a search tree from our turn through the rest of the round, choosing moves by UCB1 for whoever is making them and scoring each leaf with a random playout to the end of the game
+        cells - the flat board on our turn, as in Board.cells
+        playerId - our player ID (0-5)
+        numPlayers - number of players in game (1-6)
+        owners - the owner of each track, indexed by track *(0-31)*
+        tiles - the index in TILE_TYPES of the tile each player will place, indexed by ply, or -1 once we no longer know
+        deck - the number of each type of tile that could still be drawn, indexed like TILE_TYPES
+        random - the source of randomness for the playouts
+        root - the MonteCarloNode representing our turn
+        playouts - the number of playouts run so far
+    """
+    
+    def __init__(self, cells, playerId, numPlayers, owners, tiles, deck, candidates, seed=None):
+        """
+        __init__: array(int) * int * int * list(int) * list(str) * list(int) * list(tuple(int, int, int)) * object -> None
+        Prepares a search of the specified position on our turn
+            cells - the flat board, as in Board.cells
+            playerId - our player ID (0-5)
+            numPlayers - number of players in game (1-6)
+            owners - the owner of each track, indexed by track *(0-31)*
+            tiles - the tile each player will place next, in turn order starting with us, or '' if we don't know
+            deck - the number of each type of tile that could still be drawn, indexed like TILE_TYPES
+            candidates - the (row, column, rotation) placements of our tile from which to choose, most promising first
+            seed - the seed for the playouts' random numbers, or None to pick one arbitrarily
+        """
+        self.cells=array('b', cells)
+        self.playerId=playerId
+        self.numPlayers=numPlayers
+        self.owners=owners
+        self.tiles=[TILE_TYPES.index(tileName) if tileName else -1 for tileName in tiles]
+        self.deck=list(deck)
+        self.random=Random(seed)
+        self.root=MonteCarloNode(None, (playerId-1)%numPlayers)
+        self.root.untried=[]
+        seen=set()
+        for row, column, rotation in candidates:
+            if (row*8+column, EXITS[tileCode(tiles[0], rotation)]) not in seen: #rotations of symmetrical tiles can be indistinguishable
+                seen.add((row*8+column, EXITS[tileCode(tiles[0], rotation)]))
+                self.root.untried.append((row*8+column, tileCode(tiles[0], rotation)))
+        self.root.untried.reverse() #so that we try the most promising first
+        self.playouts=0
+    
+    def run(self, playouts, deadline=None):
+        """
+        run: int * float
+        Grows the tree by the specified number of playouts, or fewer if the deadline arrives first
+            playouts - the number of playouts to run
+            deadline - the time() by which to stop, or None to run them all
+        """
+        target=self.playouts+playouts
+        while self.playouts<target and (deadline is None or time()<deadline):
+            self._iterate()
+    
+    def statistics(self):
+        """
+        statistics: -> list(tuple(tuple(int, int, int), int, float))
+        Returns each of our moves that has been tried, along with how many playouts it has had and the total reward we got from them
+        """
+        return [((child.move[0]/8, child.move[0]%8, child.move[1]%4), child.visits, child.reward) for child in self.root.children]
+    
+    def bestMove(self):
+        """
+        bestMove: -> tuple(int, int, int)
+        Returns the (row, column, rotation) of the move that has had the most playouts, or None if none has had any
+        """
+        return mostPlayedMove([self.statistics()])
+    
+    def _iterate(self):
+        """
+        _iterate
+        Runs one round of selection, expansion, playout, and backpropagation
+        """
+        cells=array('b', self.cells)
+        node, path, ply=self.root, [self.root], 0
+        while node.untried is not None or (ply<len(self.tiles) and self.tiles[ply]!=-1 and EMPTY in cells): #we're within the part of the game we can see
+            if node.untried is None: #this node is new; what can be done from here?
+                node.untried=placements(cells, self.tiles[ply])
+                self.random.shuffle(node.untried)
+            if node.untried: #expand
+                child=MonteCarloNode(node.untried.pop(), (self.playerId+ply)%self.numPlayers)
+                node.children.append(child)
+            elif node.children: #select
+                child=node.select()
+            else: #the board is full
+                break
+            cells[child.move[0]]=child.move[1]
+            node=child
+            path.append(node)
+            ply+=1
+            if node.visits==0: #play out from our newest node
+                break
+        
+        #everyone else's tiles come out of the deck, in an unknown order:
+        drawn=[self.tiles[index] for index in range(ply, len(self.tiles)) if self.tiles[index]!=-1]
+        deck=list(self.deck)
+        for index in range(ply, len(self.tiles)):
+            if self.tiles[index]==-1 and sum(deck): #this player drew an unknown tile
+                drawn.append(_draw(deck, self.random))
+        remaining=[typeIndex for typeIndex in range(len(deck)) for _ in range(deck[typeIndex])]
+        self.random.shuffle(remaining)
+        
+        rewards=self._rewards(playout(cells, drawn+remaining, self.random))
+        self.playouts+=1
+        for node in path:
+            node.visits+=1
+            node.reward+=rewards[node.player]
+    
+    def _rewards(self, stationScores):
+        """
+        _rewards: list(int) -> list(float)
+        Returns how much each player, indexed by player ID, gains from a game ending with the specified route scores: 0.5 for a tie with his closest rival, plus or minus his lead over that rival in units of MARGIN, up to 1 or down to 0; alone, he earns a fraction of his score instead
+            stationScores - the final score of each station's route, indexed by station *(0-31)*
+        """
+        scores=[0 for _ in range(self.numPlayers)]
+        for station in range(len(stationScores)):
+            if self.owners[station]!=-1:
+                scores[self.owners[station]]+=stationScores[station]
+        if self.numPlayers==1:
+            return [min(scores[0]/200.0, 1.0)]
+        
+        rewards=[]
+        for player in range(self.numPlayers):
+            lead=scores[player]-max(scores[rival] for rival in range(self.numPlayers) if rival!=player)
+            rewards.append(0.5+max(-0.5, min(0.5, lead/MARGIN)))
+        return rewards
+
+class MonteCarloNode(object):
+    __slots__=('move', 'player', 'children', 'untried', 'visits', 'reward')
+    """
+    MonteCarloNode: tuple(int, int) * int * list(MonteCarloNode) * list(tuple(int, int)) * int * float
+    Represents a move in the search tree and what has come of it
+        move - the (space, tile code) of the placement made to reach this node
+        player - the player ID of whoever made it
+        children - the nodes for the moves that have been tried from here
+        untried - the moves that haven't, or None if we haven't yet worked out which moves there are
+        visits - the number of playouts that have passed through this node
+        reward - the total reward those playouts have given player
+    """
+    
+    def __init__(self, move, player):
+        """
+        __init__: tuple(int, int) * int -> None
+        Creates a MonteCarloNode that has yet to be visited
+            move - the (space, tile code) of the placement
+            player - the player ID of whoever made it
+        """
+        self.move=move
+        self.player=player
+        self.children=[]
+        self.untried=None
+        self.visits=0
+        self.reward=0.0
+    
+    def select(self):
+        """
+        select: -> MonteCarloNode
+        Returns the child that UCB1 deems most worth another playout for whoever chooses among them
+        pre: All of our children have been visited.
+        """
+        scale=log(self.visits)
+        return max(self.children, key=lambda child: child.reward/child.visits+EXPLORATION*sqrt(scale/child.visits))
+
+def mostPlayedMove(statisticsLists):
+    """
+    mostPlayedMove: list(list(tuple(tuple(int, int, int), int, float))) -> tuple(int, int, int)
+    Returns the move with the most playouts across one or more searches' statistics(), or None if none has had any
+        statisticsLists - the statistics() of each search
+    """
+    visits={}
+    for statistics in statisticsLists:
+        for move, count, _ in statistics:
+            visits[move]=visits.get(move, 0)+count
+    if not visits:
+        return None
+    return max(visits, key=lambda move: visits[move])
+
+def placements(cells, typeIndex):
+    """
+    placements: array(int) * int -> list(tuple(int, int))
+    Returns the distinct (space, tile code) placements of the specified type of tile that are legal on a flat board; if none are, all placements in empty spaces are permitted
+        cells - the flat board, as in Board.cells
+        typeIndex - the index of the type of tile in TILE_TYPES
+    """
+    moves=[]
+    seen=set()
+    for space in _frontier(cells):
+        safeRotations=STATION_SAFE_ROTATIONS[typeIndex*64+space]
+        for rotation in range(4):
+            if (safeRotations>>rotation)&1 and (space, EXITS[typeIndex*4+rotation]) not in seen: #rotations of symmetrical tiles can be indistinguishable
+                seen.add((space, EXITS[typeIndex*4+rotation]))
+                moves.append((space, typeIndex*4+rotation))
+    if not moves: #we're allowed to break the rules
+        moves=[(space, typeIndex*4+rotation) for space in range(64) if cells[space]==EMPTY for rotation in range(4)]
+    return moves
+
+#the rotations set in each bitmask, or all of them if none is set, indexed by bitmask:
+_ROTATION_CHOICES=tuple(tuple(rotation for rotation in range(4) if (mask>>rotation)&1) or tuple(range(4)) for mask in range(16))
+
+def playout(cells, draws, random):
+    """
+    playout: array(int) * list(int) * Random -> list(int)
+    Fills the flat board by placing each of the drawn tiles in a random legal place and rotation (or, if it has none, a random place and rotation on the frontier), returning the final score of each station's route, indexed by station *(0-31)*
+        cells - the flat board, as in Board.cells; modified in place
+        draws - the index in TILE_TYPES of each tile to be placed, in order
+        random - the source of randomness
+    """
+    frontier=_frontier(cells)
+    uniform=random.random #much cheaper than randrange(...)
+    for typeIndex in draws:
+        if not frontier: #the board is full
+            break
+        
+        #look for a space where this tile can be placed without shorting out a station, trying a few at random before checking them all:
+        for attempt in range(4):
+            index=int(uniform()*len(frontier))
+            safeRotations=STATION_SAFE_ROTATIONS[typeIndex*64+frontier[index]]
+            if safeRotations:
+                break
+        else:
+            for candidate in range(len(frontier)):
+                if STATION_SAFE_ROTATIONS[typeIndex*64+frontier[candidate]]:
+                    index=candidate
+                    safeRotations=STATION_SAFE_ROTATIONS[typeIndex*64+frontier[index]]
+                    break
+        rotations=_ROTATION_CHOICES[safeRotations]
+        space=frontier[index]
+        cells[space]=typeIndex*4+rotations[int(uniform()*len(rotations))]
+        
+        frontier[index]=frontier[-1]
+        frontier.pop()
+        for neighbor in SURROUNDINGS[space][1:]: #any empty neighbor can now be built upon
+            if cells[neighbor]==EMPTY and neighbor not in frontier:
+                frontier.append(neighbor)
+    return scoreCells(cells)
+
+def _frontier(cells):
+    """
+    _frontier: array(int) -> list(int)
+    Returns the empty spaces on the edge of a flat board or beside a ConnectedTile, in ascending order, as in Board.frontierMask()
+        cells - the flat board, as in Board.cells
+    """
+    occupied=0
+    empty=0
+    for space in range(64):
+        if cells[space]>=0:
+            occupied|=1<<space
+        elif cells[space]==EMPTY:
+            empty|=1<<space
+    return maskSpaces(empty&(EDGE_MASK|adjacentMask(occupied)))
+
+def _draw(deck, random):
+    """
+    _draw: list(int) * Random -> int
+    Removes a random tile from the deck, returning the index of its type in TILE_TYPES
+        deck - the number of each type of tile in the deck, indexed like TILE_TYPES
+        random - the source of randomness
+    pre: The deck isn't empty.
+    """
+    pick=random.randrange(sum(deck))
+    for typeIndex in range(len(deck)):
+        if pick<deck[typeIndex]:
+            deck[typeIndex]-=1
+            return typeIndex
+        pick-=deck[typeIndex]
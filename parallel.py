@@ -0,0 +1,129 @@
+"""
+Copyright (C) 2011-12 Brad Bensch and Sol Boucher
+This is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with it.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+"""
+Cable Car: Student Computer Player
+
+Root-parallel versions of our searches, which farm the work out to a pool of worker processes (threads wouldn't help, thanks to the GIL).  Each worker rebuilds its own copy of the board from a Board.snapshot() and searches either a share of our candidate moves (expectimax) or the whole tree with its own random numbers (Monte Carlo); we merge what they find.
+Author: Solomon Boucher (slb1566@rit.edu)
+Author: Brad Bensch (brb7020@rit.edu)
+"""
+from search import *
+from montecarlo import *
+from engine import QuietLogger
+from multiprocessing import Pool
+from array import array
+from time import time
+
+RETURN_MARGIN=0.05 #seconds before the deadline at which the workers stop, leaving us time to collect their results
+
+def startPool(workers):
+    """
+    startPool: int -> multiprocessing.Pool
+    Returns a pool of the specified number of worker processes, or None if that's fewer than two
+        workers - how many processes to start
+    NOTE: This should be called once, at the start of the game, and its result passed to stopPool(...) at the end.
+    """
+    if workers<2:
+        return None
+    return Pool(workers)
+
+def stopPool(pool):
+    """
+    stopPool: multiprocessing.Pool
+    Shuts down a pool started by startPool(...)
+        pool - the pool, or None if there isn't one
+    """
+    if pool is not None:
+        pool.terminate()
+        pool.join()
+
+def parallelExpectimax(pool, data, candidates, maxDepth, deadline=None):
+    """
+    parallelExpectimax: multiprocessing.Pool * PlayerData * list(tuple(int, int, int)) * int * float -> tuple(int, int, int)
+    Returns the best of the specified placements of our current tile according to expectimax searches of disjoint shares of them, run in parallel.  Only depths that every share finished are compared.
+        pool - the pool of worker processes, as started by startPool(...) with our 'workers' option
+        data - our PlayerData
+        candidates - the (row, column, rotation) placements from which to choose, most promising first; ties go to the earliest
+        maxDepth - the number of plies to look ahead
+        deadline - the time() by which we must have an answer, or None if we may take as long as we like
+    pre: candidates is not empty.
+    """
+    shares=int(data.options['workers'])
+    if deadline is not None:
+        deadline-=RETURN_MARGIN
+    position=(data.board.snapshot(), data.playerId, data.numPlayers, data.currentTile, list(data.opponentsTiles), data.POWER_STATION_THRESHOLD)
+    results=pool.map(_expectimaxWorker, [(position, candidates[share::shares], maxDepth, deadline) for share in range(shares) if candidates[share::shares]])
+    
+    depth=min(len(rankings) for rankings in results)
+    if not depth: #someone didn't even finish looking one ply ahead
+        return candidates[0]
+    best=None
+    for rankings in results:
+        placement, utility=rankings[depth-1][0]
+        if best is None or utility>best[1] or (utility==best[1] and candidates.index(placement)<candidates.index(best[0])):
+            best=(placement, utility)
+    data.logger.write('parallel search depth '+str(depth)+' across '+str(len(results))+' workers')
+    return best[0]
+
+def parallelMonteCarlo(pool, data, candidates, playouts, deadline=None):
+    """
+    parallelMonteCarlo: multiprocessing.Pool * PlayerData * list(tuple(int, int, int)) * int * float -> tuple(int, int, int)
+    Returns the best of the specified placements of our current tile according to independent Monte Carlo tree searches, run in parallel, with their statistics pooled
+        pool - the pool of worker processes, as started by startPool(...) with our 'workers' option
+        data - our PlayerData
+        candidates - the (row, column, rotation) placements from which to choose, most promising first
+        playouts - the total number of playouts to run, shared among the workers
+        deadline - the time() by which we must have an answer, or None if we may take as long as we like
+    pre: candidates is not empty.
+    """
+    shares=int(data.options['workers'])
+    if deadline is not None:
+        deadline-=RETURN_MARGIN
+    position=(data.board.snapshot(), data.playerId, data.numPlayers, data.stationOwners, data.upcomingTiles(), data.unseenTiles(), candidates)
+    seed=int(time()*1000)
+    results=pool.map(_monteCarloWorker, [(position, seed+share, -(-playouts/shares), deadline) for share in range(shares)])
+    data.logger.write('parallel mcts: '+str(sum(count for statistics in results for _, count, _ in statistics))+' playouts across '+str(shares)+' workers')
+    return mostPlayedMove(results) or candidates[0]
+
+def _expectimaxWorker(task):
+    """
+    _expectimaxWorker: tuple -> list(list(tuple(tuple(int, int, int), float)))
+    Runs in a worker process: rebuilds the position and searches the given share of the candidates, returning the ExpectimaxSearch's rankings
+        task - (position, candidates, maxDepth, deadline), where position is (snapshot, playerId, numPlayers, currentTile, opponentsTiles, POWER_STATION_THRESHOLD)
+    """
+    (snapshot, playerId, numPlayers, currentTile, opponentsTiles, threshold), candidates, maxDepth, deadline=task
+    data=PlayerData(QuietLogger(), playerId, currentTile, numPlayers)
+    data.opponentsTiles=opponentsTiles
+    data.POWER_STATION_THRESHOLD=threshold
+    data.board=Board.fromSnapshot(snapshot)
+    
+    searcher=ExpectimaxSearch(data, maxDepth, deadline)
+    searcher.search(candidates)
+    return searcher.rankings
+
+def _monteCarloWorker(task):
+    """
+    _monteCarloWorker: tuple -> list(tuple(tuple(int, int, int), int, float))
+    Runs in a worker process: searches the position with its own random numbers, returning the MonteCarloSearch's statistics()
+        task - (position, seed, playouts, deadline), where position holds MonteCarloSearch's other constructor arguments, but with a Board.snapshot() in place of the cells
+    """
+    position, seed, playouts, deadline=task
+    cells=array('b')
+    cells.fromstring(position[0])
+    searcher=MonteCarloSearch(*((cells,)+position[1:]+(seed,)))
+    searcher.run(playouts, deadline)
+    return searcher.statistics()
@@ -23,6 +23,9 @@ Author: Solomon Boucher (slb1566@rit.edu)
 Author: Brad Bensch (brb7020@rit.edu)
 """
 from board import *
+from collections import OrderedDict
+from time import time
+import json
 
 ######
 #These functions are intended for accessing the information stored in PlayerData.ourRemainingStations
@@ -51,8 +54,44 @@ def stationScore(remainingStationsMember, newValue=-1):
     
     return remainingStationsMember[1]
 
+######
+#This function is intended for interpreting the extra argument passed via the engine's config file
+######
+def parseOptions(arg):
+    """
+    parseOptions: str -> dict(str, str)
+    Returns the settings specified by the provided argument, which consists of key=value pairs separated by whitespace or commas; a key without a value is set to 'True'
+        arg - the extra argument from the config file, or 'None' if none was given
+    """
+    options={}
+    if arg and arg!='None':
+        for setting in str(arg).replace(',', ' ').split():
+            key, _, value=setting.partition('=')
+            options[key.strip().lower()]=value.strip() or 'True'
+    return options
+
+#the owner of each track, indexed by number of players and then by track *(0-31)*:
+STATION_OWNERS={1:[0 for _ in range(32)],\
+                2:[num%2 for num in range(32)],\
+                3:[0, 1, 2, 0, 2, 0, 1, 2,\
+                   1, 2, 0, 1, 2, 1, 0,-1,\
+                  -1, 2, 1, 0, 2, 1, 0, 2,\
+                   0, 2, 1, 0, 1, 2, 0, 1],\
+                4:[2, 3, 1, 0, 3, 2, 0, 1,\
+                   3, 2, 0, 1, 2, 3, 1, 0,\
+                   3, 2, 1, 0, 2, 3, 0, 1,\
+                   2, 3, 0, 1, 3, 2, 1, 0],\
+                5:[0, 3, 2, 4, 0, 1, 2, 4,\
+                   3, 0, 4, 1, 3, 0, 2,-1,\
+                  -1, 1, 2, 4, 3, 0, 1, 4,\
+                   2, 3, 1, 0, 2, 3, 4, 1],\
+                6:[0, 1, 4, 2, 0, 3, 5, 2,\
+                   4, 0, 1, 5, 4, 2, 3,-1,\
+                  -1, 1, 0, 3, 2, 5, 4, 3,\
+                   1, 2, 0, 5, 1, 4, 3, 5]}
+
 class PlayerData(object):
-    __slots__ = ('logger', 'playerId', 'currentTile', 'numPlayers', 'board', 'stationOwners', 'ourRemainingStations', 'opponentsTiles', 'mayMoveIllegally', 'POWER_STATION_THRESHOLD', 'totalKills', 'totalHits', 'dangerousness', 'ourGift', 'ourGains')
+    __slots__ = ('logger', 'playerId', 'currentTile', 'numPlayers', 'board', 'stationOwners', 'ourRemainingStations', 'opponentsTiles', 'mayMoveIllegally', 'options', 'pool', 'profiler', 'POWER_STATION_THRESHOLD', 'MOVE_WEIGHTS', 'DEADLINE_MARGIN', 'totalKills', 'totalHits', 'dangerousness', 'ourGift', 'ourGains')
     """
     Our data members:
         board - stores the tiles
@@ -63,52 +102,37 @@ class PlayerData(object):
         opponentsTiles - a list of our opponents' next tile letters, indexed by player ID
             NOTE: our tile and any eliminated opponents' tiles are set to ''
         mayMoveIllegally - a list of who may legally make an invalid move, indexed by player ID
+        options - the settings passed to us via the config file, as returned by parseOptions(...)
+        pool - the pool of worker processes with which to search in parallel, or None if we're on our own
+        profiler - the Profiler timing our moves, or None if we're not being profiled
         POWER_STATION_THRESHOLD - the gain we'd need to see before we'd complete one of our routes to a power station
+        MOVE_WEIGHTS - how much each of a PotentialMove's enemyLosses, ourLosses, deltaEndangerment, enemyGains, and ourGains counts toward its desirability
+        DEADLINE_MARGIN - the fraction of each move's time budget (up to RETURN_MARGIN seconds) set aside for making the move once we've settled on it
     """
     
-    def __init__(self, logger, playerId, currentTile, numPlayers):
+    def __init__(self, logger, playerId, currentTile, numPlayers, options={}):
         """
-        __init__: PlayerData * Engine.Logger * int * NoneType * int -> None
+        __init__: PlayerData * Engine.Logger * int * NoneType * int * dict(str, str) -> None
         Constructs and returns an instance of PlayerData.
             self - new instance
             logger - the engine logger
             playerId - my player ID (0-5)
             currentTile - my current hand tile (initially None)
             numPlayers - number of players in game (1-6)
+            options - our settings, as returned by parseOptions(...)
         """
         self.logger = logger
         self.playerId = playerId
         self.currentTile = currentTile
         self.numPlayers = numPlayers
+        self.options = dict(options)
+        self.pool = None
+        self.profiler = None
         
         self.board=Board()
         
-        #who owns each given track?
-        if numPlayers==1:
-            self.stationOwners=[0 for _ in range(32)]
-        elif numPlayers==2:
-            self.stationOwners=[num%2 for num in range(32)]
-        elif numPlayers==3:
-            self.stationOwners=[0, 1, 2, 0, 2, 0, 1, 2,\
-                                1, 2, 0, 1, 2, 1, 0,-1,\
-                               -1, 2, 1, 0, 2, 1, 0, 2,\
-                                0, 2, 1, 0, 1, 2, 0, 1]
-        elif numPlayers==4:
-            self.stationOwners=[2, 3, 1, 0, 3, 2, 0, 1,\
-                                3, 2, 0, 1, 2, 3, 1, 0,\
-                                3, 2, 1, 0, 2, 3, 0, 1,\
-                                2, 3, 0, 1, 3, 2, 1, 0]
-        elif numPlayers==5:
-            self.stationOwners=[0, 3, 2, 4, 0, 1, 2, 4,\
-                                3, 0, 4, 1, 3, 0, 2,-1,\
-                               -1, 1, 2, 4, 3, 0, 1, 4,\
-                                2, 3, 1, 0, 2, 3, 4, 1]
-        elif numPlayers==6:
-            self.stationOwners=[0, 1, 4, 2, 0, 3, 5, 2,\
-                                4, 0, 1, 5, 4, 2, 3,-1,\
-                               -1, 1, 0, 3, 2, 5, 4, 3,\
-                                1, 2, 0, 5, 1, 4, 3, 5]
-                
+        self.stationOwners=list(STATION_OWNERS[numPlayers]) #who owns each given track?
+        
         #which tracks are ours?
         self.ourRemainingStations=[]
         for station in range(len(self.stationOwners)):
@@ -125,29 +149,21 @@ class PlayerData(object):
             tileName - the type of tile, 'a'-'j' (default is our current tile)
             rotation - the tile's rotation, 0-3
         """
+        return TILE_CLASSES[self.resolveTileName(tileName)](rotation)
+    
+    def resolveTileName(self, tileName=''):
+        """
+        resolveTileName: str -> str
+        Returns the type of tile that makeTile(...) would construct for the specified name
+            tileName - the type of tile, 'a'-'j' (default is our current tile)
+        """
         if tileName=='':
             tileName=self.currentTile
         
-        if tileName=='a':
-            return TileA(rotation)
-        elif tileName=='b':
-            return TileB(rotation)
-        elif tileName=='c':
-            return TileC(rotation)
-        elif tileName=='d':
-            return TileD(rotation)
-        elif tileName=='e':
-            return TileE(rotation)
-        elif tileName=='f':
-            return TileF(rotation)
-        elif tileName=='g':
-            return TileG(rotation)
-        elif tileName=='h':
-            return TileH(rotation)
-        elif tileName=='i':
-            return TileI(rotation)
-        else:
-            return TileJ(rotation)
+        if tileName in TILE_CLASSES:
+            return tileName
+        else: #anything unrecognized is treated as a j, as it always has been
+            return 'j'
     
     def trackOwner(self, trackId):
         """
@@ -172,23 +188,21 @@ class PlayerData(object):
                     return True
             return False
         else:
+            if self.profiler is not None:
+                self.profiler.count('routeInDanger')
             if attacker==self.playerId: #WE are the attacker!
-                tileType=self.currentTile
+                tileType=self.resolveTileName(self.currentTile)
             else:
-                tileType=self.opponentsTiles[attacker]
-            routeEnd=self.board.followRoute(track)
-            row, column=self.board.lookupTileCoordinates(routeEnd[0])
-            side=routeEnd[1]
+                tileType=self.resolveTileName(self.opponentsTiles[attacker])
+            edgeRotations, powerRotations, lengths=self.board.routeDangers(track, tileType)
+            if not edgeRotations and not powerRotations: #nothing he could draw would hurt
+                return False
+            row, column=self.board.routeEndCoordinates(track)
             for rotation in range(4):
-                tile=self.makeTile(tileType, rotation)
-                if self.board.validPlacement(tile, row, column) or self.mayMoveIllegally[attacker]: #move would be valid or would have just cause not to be
-                    self.board.addTile(tile, row, column)
-                    endpoint=tile.followRoute(side)[0]
-                    vulnerable=isinstance(endpoint, OuterStations)
-                    if disallowLowScore or attacker==self.playerId:
-                        vulnerable=vulnerable or (isinstance(endpoint, PowerStation) and self.board.calculateTrackScore(track)/2<self.POWER_STATION_THRESHOLD)
-                    self.board.removeTile(row, column)
-                    if vulnerable:
+                if self.board.canPlace(tileType, rotation, row, column) or self.mayMoveIllegally[attacker]: #move would be valid or would have just cause not to be
+                    if (edgeRotations>>rotation)&1: #straight to the edge
+                        return True
+                    if (disallowLowScore or attacker==self.playerId) and (powerRotations>>rotation)&1 and lengths[rotation]<self.POWER_STATION_THRESHOLD: #to a power station for a pittance
                         return True
             return False
     
@@ -221,38 +235,66 @@ class PlayerData(object):
             track - the track to extend
             completeTrack - our goal, whether it be to complete the track or not to complete it
         """
-        row, column=self.board.lookupTileCoordinates(self.board.followRoute(track)[0])
+        outcomes=self.board.routeOutcomes(track, self.resolveTileName())
+        if outcomes is None: #there's nowhere to extend it
+            return []
+        row, column=self.board.routeEndCoordinates(track)
         oldScore=self.board.calculateTrackScore(track)
         options=[] #stores (rotation, score)
         for rotation in range(4):
-            ourTile=self.makeTile(rotation=rotation)
-            if self.board.validPlacement(ourTile, row, column) or (not self.board.lookupTile(row, column) and self.mayMoveIllegally[self.playerId]): #we're legal or allowed not to be
-                self.board.addTile(ourTile, row, column)
-                endpoint=self.board.followRoute(track)[0]
-                if isinstance(endpoint, OuterStations)==completeTrack or isinstance(endpoint, PowerStation)==completeTrack: #this rotation completes it
+            if self.board.canPlace(self.resolveTileName(), rotation, row, column) or self.mayMoveIllegally[self.playerId]: #we're legal or allowed not to be
+                _, ending, length=outcomes[rotation]
+                if (ending==ROUTE_EDGE)==completeTrack or (ending==ROUTE_POWER)==completeTrack: #this rotation completes it
+                    self.board.make(self.makeTile(rotation=rotation), row, column)
                     if not self.tileJeopardizesOurRoutes(row, column, self.POWER_STATION_THRESHOLD): #we haven't done anything significant to our own routes at the same time
-                        options.append([row, column, rotation, oldScore, self.board.calculateTrackScore(track)-oldScore])
+                        options.append([row, column, rotation, oldScore, (length*2 if ending==ROUTE_POWER else length)-oldScore])
                     #else:
                         #print 'NB: Placing at '+str((row, column))+' w/ rotation '+str(rotation)+' would jeopardize our own route'
-                self.board.removeTile(row, column)
+                    self.board.unmake()
         return options
     
     ######
     #These functions are intended to be called regularly in order to update our recorded information.
     ######
+    def upcomingTiles(self):
+        """
+        upcomingTiles: -> list(str)
+        Returns the tiles that we and then each of our opponents will place next, in turn order starting with us; an opponent whose tile we don't know gets ''
+        """
+        tiles=[self.resolveTileName(self.currentTile)]
+        for turn in range(1, self.numPlayers):
+            opponent=(self.playerId+turn)%self.numPlayers
+            tiles.append(self.opponentsTiles[opponent] and self.resolveTileName(self.opponentsTiles[opponent]))
+        return tiles
+    
+    def unseenTiles(self):
+        """
+        unseenTiles: -> list(int)
+        Returns how many of each type of tile could still be drawn from the deck--that is, aren't on the board or in a known hand--indexed like TILE_TYPES
+        """
+        deck=list(TILE_COUNTS)
+        for code in self.board.cells:
+            if code>=0:
+                deck[code/4]-=1
+        for tileName in self.upcomingTiles():
+            if tileName:
+                deck[TILE_TYPES.index(tileName)]-=1
+        return [max(count, 0) for count in deck]
+    
     def updateOurStations(self):
         """
         updateOurStations
         Stops us from considering our completed stations and updates the scores of those on which we are still working
         post: ourRemainingStations is sorted in descending order by score, then in ascending order by ID number.
         """
+        routes=self.board.traceAllRoutes()
         deletionStack=[]
         for station in range(len(self.ourRemainingStations)):
-            if(self.board.routeIsComplete(stationId(self.ourRemainingStations[station]))):
+            if(routes.complete[stationId(self.ourRemainingStations[station])-1]):
                 deletionStack.append(station) #flag this track for deletion
                 #print 'They\'ve given us a broadside!'
             else: #track may still be extended
-                stationScore(self.ourRemainingStations[station], self.board.calculateTrackScore(stationId(self.ourRemainingStations[station]))) #update our record of the track's score
+                stationScore(self.ourRemainingStations[station], routes.score[stationId(self.ourRemainingStations[station])-1]) #update our record of the track's score
         
         while len(deletionStack):
             del self.ourRemainingStations[deletionStack.pop()]
@@ -270,42 +312,15 @@ class PlayerData(object):
                 tileName=self.currentTile
             else:
                 tileName=self.opponentsTiles[player]
-            if tileName: #we know of this player's next tile
-                for row in range(8):
-                    for column in range(8):
-                        for rotation in range(4):
-                            if self.board.validPlacement(self.makeTile(tileName, rotation), row, column): #this guy has no excuse but to make a legal move
-                                self.mayMoveIllegally[player]=False
-                                break
-                        if not self.mayMoveIllegally[player]:
-                            break
-                    if not self.mayMoveIllegally[player]:
-                        break
+            if tileName and self.board.hasLegalPlacement(self.resolveTileName(tileName)): #we know of this player's next tile, and this guy has no excuse but to make a legal move
+                self.mayMoveIllegally[player]=False
                     
     def firstTurn(self):
         """
         firstTurn
         Returns True or False if we have the first turn
         """
-        occupiedFlag = True
-        for row in range(8): #Are any tiles placed yet?
-            if occupiedFlag == False:
-                break
-            for column in range(8):
-                if occupiedFlag == False:
-                    break
-                if self.board.lookupTile(row, column) != None:
-                    if row == 3 and column == 3:
-                        break
-                    elif row == 3 and column == 4:
-                        break
-                    elif row == 4 and column == 3:
-                        break
-                    elif row == 4 and column == 4:
-                        break
-                    else:
-                        occupiedFlag = False
-        return occupiedFlag
+        return not self.board.occupied #Are any tiles placed yet?
             
     def __str__(self):
         """
@@ -322,6 +337,152 @@ class PlayerData(object):
         
         return result
 
+class TranspositionTable(object):
+    __slots__=('capacity', 'entries')
+    """
+    TranspositionTable: int * OrderedDict
+    A bounded cache of evaluations keyed by board position (along with anything else they depend upon); when full, it forgets whichever entry was used least recently
+        capacity - the most entries to keep at once
+        entries - the cached evaluations, ordered from least to most recently used
+    """
+    
+    def __init__(self, capacity=20000):
+        """
+        __init__: int -> None
+        Creates an empty TranspositionTable
+            capacity - the most entries to keep at once
+        """
+        self.capacity=capacity
+        self.entries=OrderedDict()
+    
+    def lookup(self, key):
+        """
+        lookup: object -> object
+        Returns the evaluation stored under the specified key, or None if there isn't one
+            key - a hashable description of the position, typically beginning with Board.zobrist
+        """
+        value=self.entries.pop(key, None)
+        if value is not None: #it's now the most recently used
+            self.entries[key]=value
+        return value
+    
+    def store(self, key, value):
+        """
+        store: object * object
+        Remembers the specified evaluation under the specified key, forgetting the least recently used one if we're full
+            key - a hashable description of the position, typically beginning with Board.zobrist
+            value - the evaluation; must not be None
+        """
+        self.entries.pop(key, None)
+        self.entries[key]=value
+        if len(self.entries)>self.capacity: #make room
+            self.entries.popitem(False)
+    
+    def __len__(self):
+        """
+        __len__: -> int
+        Returns the number of evaluations currently stored
+        """
+        return len(self.entries)
+
+class Profiler(object):
+    __slots__=('logFile', 'moves', 'phase', 'phaseStarted', 'moveTimes', 'moveCounts', 'totalTimes', 'totalCalls', 'totalCounts')
+    """
+    Profiler: file * int * str * float * OrderedDict * dict * dict * dict * dict
+    Times each phase of our moves and counts the expensive operations within them
+        logFile - the file to which to write each move's findings as a line of JSON, or None to leave it to the logger
+        moves - the number of moves profiled so far
+        phase - the name of the phase under way, or None between phases
+        phaseStarted - the time() at which the phase under way began
+        moveTimes - the seconds spent in each phase of the move under way, in the order they began
+        moveCounts - the number of times each operation (validPlacement, routeInDanger, routeTrace, tileTrace) has been performed during the move under way
+        totalTimes - the seconds spent in each phase, over all moves
+        totalCalls - the number of times each phase has begun, over all moves
+        totalCounts - the number of times each operation has been performed, over all moves
+    """
+    
+    def __init__(self, logFile=None):
+        """
+        __init__: file -> None
+        Creates a Profiler that hasn't seen any moves yet
+            logFile - the file to which to write each move's findings, or None to leave it to the logger
+        """
+        self.logFile=logFile
+        self.moves=0
+        self.phase=None
+        self.phaseStarted=0.0
+        self.moveTimes=OrderedDict()
+        self.moveCounts={}
+        self.totalTimes={}
+        self.totalCalls={}
+        self.totalCounts={}
+    
+    def startMove(self):
+        """
+        startMove
+        Begins a new move, forgetting any operations performed since the last one ended
+        """
+        self.moveTimes=OrderedDict()
+        self.moveCounts={}
+    
+    def enter(self, phase):
+        """
+        enter: str
+        Ends the phase under way, if any, and begins the specified one
+            phase - the name of the phase
+        """
+        self._leave()
+        self.phase=phase
+        self.totalCalls[phase]=self.totalCalls.get(phase, 0)+1
+        self.phaseStarted=time()
+    
+    def count(self, operation):
+        """
+        count: str
+        Notes that the specified operation has been performed once more
+            operation - the name of the operation
+        """
+        self.moveCounts[operation]=self.moveCounts.get(operation, 0)+1
+    
+    def finishMove(self, logger):
+        """
+        finishMove: Engine.Logger
+        Ends the move under way, adding it to the totals and reporting on it either to the log file or to the specified logger
+            logger - the engine logger
+        """
+        self._leave()
+        self.moves+=1
+        for operation, count in self.moveCounts.items():
+            self.totalCounts[operation]=self.totalCounts.get(operation, 0)+count
+        
+        if self.logFile is not None:
+            self.logFile.write(json.dumps({'move':self.moves, 'phases':self.moveTimes, 'counts':self.moveCounts}, separators=(',', ':'))+'\n')
+        else:
+            logger.write('profile: '+', '.join(phase+' '+str(round(seconds*1000, 2))+'ms' for phase, seconds in self.moveTimes.items())+'; '+', '.join(operation+' '+str(count) for operation, count in sorted(self.moveCounts.items())))
+    
+    def summary(self):
+        """
+        summary: -> str
+        Returns a description of where the time went over all moves: each phase's total time and number of calls, and the average number of times each operation was performed per move
+        """
+        lines=['Moves profiled: '+str(self.moves)]
+        for phase in sorted(self.totalTimes, key=self.totalTimes.get, reverse=True):
+            lines.append('Time spent in '+phase+': '+str(round(self.totalTimes[phase], 3))+'s over '+str(self.totalCalls[phase])+' calls')
+        for operation in sorted(self.totalCounts):
+            lines.append(operation+' calls per move: '+str(round(self.totalCounts[operation]/float(max(self.moves, 1)), 1)))
+        return '\n'.join(lines)
+    
+    def _leave(self):
+        """
+        _leave
+        Ends the phase under way, if any, charging it with the time since it began
+        """
+        if self.phase is not None:
+            elapsed=time()-self.phaseStarted
+            self.moveTimes[self.phase]=self.moveTimes.get(self.phase, 0.0)+elapsed
+            self.totalTimes[self.phase]=self.totalTimes.get(self.phase, 0.0)+elapsed
+            self.phase=None
+
 class PotentialMove(object):
     __slots__=('row', 'column', 'rotation', 'tracks', 'ourLosses', 'enemyLosses', 'deltaEndangerment', 'ourGains', 'enemyGains')
     """
@@ -364,16 +525,18 @@ class PotentialMove(object):
             self.tracks[-1].oldScore=data.board.calculateTrackScore(self.tracks[-1].number) #store the old score
         
         #collect data on the surrounding routes:
-        data.board.addTile(tile, row, column)
+        data.board.make(tile, row, column)
         for changedTrack in self.tracks:
             changedTrack.completed=data.board.routeIsComplete(changedTrack.number)
             if not changedTrack.completed:
                 #check whether we've cornered this track, effectively "ending" it:
-                endCoordinates=data.board.lookupTileCoordinates(data.board.followRoute(changedTrack.number)[0])
+                endCoordinates=data.board.routeEndCoordinates(changedTrack.number)
                 testTile=TileA(0) #will be used solely to discover what borders the endpoint
                 data.board.addTile(testTile, endCoordinates[0], endCoordinates[1], False)
                 changedTrack.completed=True
                 for side in range(4):
+                    if data.profiler is not None:
+                        data.profiler.count('tileTrace')
                     if not testTile.routeComplete(side): #there's a way out of this hole
                         changedTrack.completed=False
                         break
@@ -387,7 +550,7 @@ class PotentialMove(object):
                                 changedTrack.nowVulnerable=True
                                 break
             changedTrack.deltaScore=data.board.calculateTrackScore(changedTrack.number)-changedTrack.oldScore
-        data.board.removeTile(row, column)
+        data.board.unmake()
         
         self.ourLosses, self.enemyLosses, self.deltaEndangerment, self.ourGains, self.enemyGains=0, 0, 0, 0, 0
         #summarize our findings:
@@ -0,0 +1,229 @@
+"""
+Copyright (C) 2011-12 Brad Bensch and Sol Boucher
+This is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with it.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+"""
+Cable Car: Student Computer Player
+
+A lookahead search over the rest of the round and beyond.  Each player is assumed to maximize his own lead (max-n); players whose next tiles we know move deterministically, while those we don't are averaged over the tiles left in the deck (expectimax).
+Author: Solomon Boucher (slb1566@rit.edu)
+Author: Brad Bensch (brb7020@rit.edu)
+"""
+from playerData import *
+from time import time
+
+class SearchTimeout(Exception):
+    """
+    SearchTimeout
+    Raised within a search whose deadline has passed, abandoning the current iteration
+    """
+    pass
+
+class ExpectimaxSearch(object):
+    __slots__=('data', 'board', 'maxDepth', 'deadline', 'tiles', 'deck', 'table', 'nodes', 'elapsed', 'depthReached', 'rankings')
+    """
+    ExpectimaxSearch: PlayerData * Board * int * float * list(str) * list(int) * TranspositionTable * int * float * int * list(list(tuple(tuple(int, int, int), float)))
+    Searches for our best move, deepening iteratively from a single ply up to the configured depth or until the deadline, whichever comes first
+        data - our PlayerData
+        board - the board on which to make and unmake the moves under consideration
+        maxDepth - the number of plies (individual players' moves) to look ahead
+        deadline - the time() by which the search must finish, or None if it may take as long as it likes
+        tiles - the tile each player will place, indexed by ply, or '' once we no longer know
+        deck - the number of each type of tile that could still be drawn, indexed like TILE_TYPES
+        table - a TranspositionTable of the outcomes of the positions we've already searched
+        nodes - the number of moves made during the search so far
+        elapsed - the number of seconds spent searching so far
+        depthReached - the depth of the deepest iteration that has finished
+        rankings - each finished iteration's placements, along with what each is worth to us, best first; indexed by depth-1
+    """
+    
+    def __init__(self, data, maxDepth, deadline=None):
+        """
+        __init__: PlayerData * int * float -> None
+        Prepares a search of the current position on our turn
+            data - our PlayerData
+            maxDepth - the number of plies to look ahead (at least 1)
+            deadline - the time() by which the search must finish, or None if it may take as long as it likes
+        """
+        self.data=data
+        self.board=data.board
+        self.maxDepth=max(1, maxDepth)
+        self.deadline=deadline
+        
+        self.tiles=data.upcomingTiles() #having watched them move since our last turn, we know our opponents' tiles
+        self.deck=data.unseenTiles()
+        self.table=TranspositionTable(100000)
+        self.nodes=0
+        self.elapsed=0.0
+        self.depthReached=0
+        self.rankings=[]
+    
+    def search(self, candidates):
+        """
+        search: list(tuple(int, int, int)) -> tuple(int, int, int)
+        Returns the best of the specified placements of our current tile, searching each iteration's moves in order of the previous one's findings.  If the deadline arrives first, the unfinished iteration is abandoned in favor of the last one to finish (or, failing that, the first candidate).
+            candidates - the (row, column, rotation) placements from which to choose, most promising first; ties go to the earliest
+        pre: candidates is not empty.
+        """
+        started=time()
+        order=list(candidates)
+        madeMoves, deck=len(self.board.undoLog), list(self.deck)
+        try:
+            for depth in range(1, self.maxDepth+1):
+                nodes=self.nodes
+                outcomes=self._rankPlacements(order, 0, depth, self.tiles[0])
+                order=[placement for placement, _ in outcomes]
+                self.depthReached=depth
+                self.rankings.append([(placement, self._utility(outcome, self.data.playerId)) for placement, outcome in outcomes])
+                self.data.logger.write('search depth '+str(depth)+': '+str(self.nodes-nodes)+' nodes, '+str(self.nodesPerSecond(time()-started))+' nodes/s')
+                if depth>=self.board.cells.count(EMPTY): #we've seen to the end of the game
+                    break
+        except SearchTimeout: #put everything back the way we found it
+            while len(self.board.undoLog)>madeMoves:
+                self.board.unmake()
+            self.deck=deck
+            self.data.logger.write('search out of time after depth '+str(self.depthReached)+': '+str(self.nodes)+' nodes, '+str(self.nodesPerSecond(time()-started))+' nodes/s')
+        self.elapsed+=time()-started
+        return order[0]
+    
+    def nodesPerSecond(self, elapsed=None):
+        """
+        nodesPerSecond: float -> int
+        Returns the average number of moves searched each second
+            elapsed - the number of seconds over which to average, or None to use all the time spent searching
+        """
+        if elapsed is None:
+            elapsed=self.elapsed
+        if elapsed<=0:
+            return 0
+        return int(self.nodes/elapsed)
+    
+    def _rankPlacements(self, placements, ply, depth, tileName):
+        """
+        _rankPlacements: list(tuple(int, int, int)) * int * int * str -> list(tuple(tuple(int, int, int), list(float)))
+        Returns each of the specified placements of the specified tile along with its outcome, best first for the player on move (stably, so ties keep their order)
+            placements - the (row, column, rotation) placements to consider
+            ply - how many moves into the search this one is
+            depth - the number of plies left to search, including this one
+            tileName - the type of tile being placed
+        """
+        player=self._player(ply)
+        outcomes=[]
+        for row, column, rotation in placements:
+            if self.deadline is not None and time()>=self.deadline:
+                raise SearchTimeout()
+            self.board.make(TILE_CLASSES[tileName](rotation), row, column)
+            self.nodes+=1
+            outcomes.append(((row, column, rotation), self._outcome(ply+1, depth-1)))
+            self.board.unmake()
+        outcomes.sort(key=lambda outcome: self._utility(outcome[1], player), reverse=True)
+        return outcomes
+    
+    def _outcome(self, ply, depth):
+        """
+        _outcome: int * int -> list(float)
+        Returns each player's expected score, indexed by player ID, if the game proceeds from the current position with best play for the specified number of plies
+            ply - how many moves into the search this one is
+            depth - the number of plies left to search
+        """
+        if depth==0 or EMPTY not in self.board.cells: #we've looked far enough or the game is over
+            return self._evaluate()
+        
+        key=(self.board.zobrist, ply, depth)
+        outcome=self.table.lookup(key)
+        if outcome is not None: #we've been here before
+            return outcome
+        
+        if ply<len(self.tiles) and self.tiles[ply]: #we know what this player will place
+            outcome=self._bestOutcome(ply, depth, self.tiles[ply])
+        else: #average over whatever he might draw
+            total=float(sum(self.deck))
+            if not total: #there's nothing left to draw
+                return self._evaluate()
+            outcome=[0.0 for _ in range(self.data.numPlayers)]
+            for index in range(len(self.deck)):
+                if self.deck[index]:
+                    probability=self.deck[index]/total
+                    self.deck[index]-=1
+                    drawn=self._bestOutcome(ply, depth, TILE_TYPES[index])
+                    self.deck[index]+=1
+                    for player in range(len(outcome)):
+                        outcome[player]+=probability*drawn[player]
+        
+        self.table.store(key, outcome)
+        return outcome
+    
+    def _bestOutcome(self, ply, depth, tileName):
+        """
+        _bestOutcome: int * int * str -> list(float)
+        Returns the outcome of the best placement of the specified tile by the player on move
+            ply - how many moves into the search this one is
+            depth - the number of plies left to search, including this one
+            tileName - the type of tile being placed
+        """
+        return self._rankPlacements(self._placements(tileName), ply, depth, tileName)[0][1]
+    
+    def _placements(self, tileName):
+        """
+        _placements: str -> list(tuple(int, int, int))
+        Returns the distinct (row, column, rotation) placements of the specified tile that its player may make; if none are legal, all are permitted
+            tileName - the type of tile being placed
+        pre: The board has at least one empty space.
+        """
+        placements=self.board.legalPlacements(tileName) or [(space/8, space%8, rotation) for space in range(64) if self.board.cells[space]==EMPTY for rotation in range(4)]
+        
+        #rotations of symmetrical tiles can be indistinguishable:
+        distinct=[]
+        seen=set()
+        for row, column, rotation in placements:
+            effect=(row, column, EXITS[tileCode(tileName, rotation)])
+            if effect not in seen:
+                seen.add(effect)
+                distinct.append((row, column, rotation))
+        return distinct
+    
+    def _player(self, ply):
+        """
+        _player: int -> int
+        Returns the ID of the player who makes the specified move
+            ply - how many moves into the search this one is
+        """
+        return (self.data.playerId+ply)%self.data.numPlayers
+    
+    def _evaluate(self):
+        """
+        _evaluate: -> list(float)
+        Returns each player's estimated final score on the current board, indexed by player ID.  An incomplete route is expected to grow by POWER_STATION_THRESHOLD (which is why we'd only trade it for a power station's bonus beyond that), unless it ends beside a cable car station where anyone might complete it.
+        """
+        scores=[0.0 for _ in range(self.data.numPlayers)]
+        routes=self.board.traceAllRoutes()
+        for track in range(1, 33):
+            owner=self.data.trackOwner(track)
+            if owner!=-1 and routes.score[track-1]>0:
+                scores[owner]+=routes.score[track-1]
+                if not routes.complete[track-1] and not (EDGE_MASK>>routes.endSpace[track-1])&1: #it has room to grow
+                    scores[owner]+=self.data.POWER_STATION_THRESHOLD
+        return scores
+    
+    def _utility(self, outcome, player):
+        """
+        _utility: list(float) * int -> float
+        Returns how much the specified outcome is worth to the specified player: his lead over his closest rival
+            outcome - each player's score, indexed by player ID
+            player - the player ID (0-5)
+        """
+        if len(outcome)==1:
+            return outcome[0]
+        return outcome[player]-max(outcome[rival] for rival in range(len(outcome)) if rival!=player)
@@ -0,0 +1,170 @@
+"""
+Copyright (C) 2011-12 Brad Bensch and Sol Boucher
+This is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with it.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+
+"""
+Cable Car: Student Computer Player
+
+Regression games for the local engine.  Run it from the directory containing the package, e.g.:
+    python -m GroupA.testEngine
+Author: Solomon Boucher (slb1566@rit.edu)
+Author: Brad Bensch (brb7020@rit.edu)
+"""
+from engine import *
+import os
+import sys
+import unittest
+
+PLAYER_PACKAGE=__name__.rpartition('.')[0] or __package__ #the package whose player we seat
+
+class IllegalPlayer(object):
+    """
+    IllegalPlayer
+    Implements the engine protocol, but always tries to place its tile on a power station
+    """
+    
+    def init(self, playerId, numPlayers, startTile, logger, arg='None'):
+        """
+        init: int * int * str * object * str -> list(object)
+        Returns our player ID and current tile
+        """
+        return [playerId, startTile]
+    
+    def move(self, playerData):
+        """
+        move: list(object) -> tuple(list(object), PlayerMove)
+        Returns an illegal move
+        """
+        return playerData, PlayerMove(playerData[0], (3, 3), playerData[1], 0)
+    
+    def move_info(self, playerData, playerMove, nextTile):
+        """
+        move_info: list(object) * PlayerMove * str -> list(object)
+        Notes our next tile
+        """
+        if playerMove is None:
+            playerData[1]=nextTile
+        return playerData
+    
+    def game_over(self, playerData, historyFileName=None):
+        """
+        game_over: list(object) * str
+        Does nothing
+        """
+        pass
+
+class EliminationTest(unittest.TestCase):
+    """
+    EliminationTest
+    Plays games in which players are kicked out, which leaves the deck short of filling the board
+    """
+    
+    def setUp(self):
+        """
+        setUp
+        Silences the players' chatter
+        """
+        self.chatter=sys.stdout
+        sys.stdout=open(os.devnull, 'w')
+    
+    def tearDown(self):
+        """
+        tearDown
+        Restores standard output
+        """
+        sys.stdout.close()
+        sys.stdout=self.chatter
+    
+    def testAgainstIllegalPlayer(self):
+        """
+        testAgainstIllegalPlayer
+        The game ends when the deck runs out instead of asking for moves without a tile
+        """
+        for numPlayers in range(2, 7):
+            players=[__import__(PLAYER_PACKAGE) for _ in range(numPlayers-1)]+[IllegalPlayer()]
+            result=playGame(players, numPlayers)
+            self.assertEqual(result.eliminated, [False for _ in range(numPlayers-1)]+[True])
+            self.assertEqual(len(result.moves), sum(TILE_COUNTS)-1)
+            self.assertTrue(EMPTY in replayCells(result.moves))
+    
+    def testAllIllegal(self):
+        """
+        testAllIllegal
+        The game ends as soon as everyone has been kicked out
+        """
+        result=playGame([IllegalPlayer() for _ in range(3)], 0)
+        self.assertEqual(result.eliminated, [True, True, True])
+        self.assertEqual(result.moves, [])
+        self.assertEqual(result.scores, [0, 0, 0])
+
+class DeadlineTest(unittest.TestCase):
+    """
+    DeadlineTest
+    Plays games with a time budget for each move
+    """
+    
+    def setUp(self):
+        """
+        setUp
+        Silences the players' chatter
+        """
+        self.chatter=sys.stdout
+        sys.stdout=open(os.devnull, 'w')
+    
+    def tearDown(self):
+        """
+        tearDown
+        Restores standard output
+        """
+        sys.stdout.close()
+        sys.stdout=self.chatter
+    
+    def testUnusedBudget(self):
+        """
+        testUnusedBudget
+        A deadline that never arrives doesn't change which moves are played
+        """
+        for seed in (2, 3):
+            for numPlayers in (2, 4):
+                players=[__import__(PLAYER_PACKAGE) for _ in range(numPlayers)]
+                untimed=playGame(players, seed)
+                timed=playGame(players, seed, ['time=100' for _ in range(numPlayers)])
+                self.assertEqual([(playerMove.position, playerMove.rotation) for playerMove in timed.moves], [(playerMove.position, playerMove.rotation) for playerMove in untimed.moves])
+    
+    def testWithinBudget(self):
+        """
+        testWithinBudget
+        Every move returns within its time budget, however much work is left when the search stops
+        """
+        for arg in ('time=0.2', 'search=expectimax time=0.2', 'search=expectimax time=0.2 evaluator=batch', 'search=mcts time=0.2'):
+            players=[__import__(PLAYER_PACKAGE) for _ in range(2)]
+            result=playGame(players, 1, [arg for _ in players], 16)
+            for moveTimes in result.moveTimes:
+                self.assertTrue(max(moveTimes)<0.2, arg+' took '+str(max(moveTimes))+' seconds')
+
+def replayCells(moves):
+    """
+    replayCells: list(PlayerMove) -> array(int)
+    Returns the Board.cells of a new board after the specified moves
+        moves - the moves to replay, in order
+    """
+    board=Board()
+    for playerMove in moves:
+        board.addTile(TILE_CLASSES[playerMove.tileName](playerMove.rotation), playerMove.position[0], playerMove.position[1])
+    return board.cells
+
+if __name__=='__main__':
+    unittest.main()
@@ -0,0 +1,129 @@
+"""
+Copyright (C) 2011-12 Brad Bensch and Sol Boucher
+This is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with it.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+"""
+Cable Car: Student Computer Player
+
+Plays our player against itself under different settings, many seeded games at a time, using the local engine and a pool of worker processes.  Each game's results are written out as a line of JSON as soon as they come in.  Run it from the directory containing the package, e.g.:
+    python -m GroupA.tournament --games 1000 --workers 4 --output results.jsonl --strategy None --strategy "weights=20/-25/-5/-1/1"
+Author: Solomon Boucher (slb1566@rit.edu)
+Author: Brad Bensch (brb7020@rit.edu)
+"""
+from engine import *
+from gameRecord import encodeMove, decodeMove, startRecord, writeGame
+from parallel import startPool, stopPool
+from itertools import imap
+from argparse import ArgumentParser
+import json
+import os
+import sys
+
+PLAYER_PACKAGE=__name__.rpartition('.')[0] or __package__ #the package whose player we pit against itself
+
+def runTournament(games, output, strategies, playerCounts=range(1, 7), workers=1, seed=0, record=None):
+    """
+    runTournament: int * file * list(str) * list(int) * int * int * file -> dict(str, list(int))
+    Plays the specified number of games and writes each one's record to the specified file as a line of JSON, in order, returning the games played, games won (ties included), and total score of each strategy
+        games - how many games to play
+        output - the file to which to write the records
+        strategies - the extra arguments with which to initialize our player, one per strategy; seats are dealt them in rotation, starting one further along each game
+        playerCounts - how many players to seat at each game, in rotation
+        workers - how many processes to play in
+        seed - the seed for the first game's deck; each game after it gets the next one
+        record - a file of game records, as begun by startRecord(...), to which to append every game's moves, or None not to keep them
+    NOTE: A strategy mustn't ask for workers of its own, since the worker processes can't start any more.
+    """
+    tasks=[(PLAYER_PACKAGE, game, seed+game, [strategies[(game+player)%len(strategies)] for player in range(playerCounts[game%len(playerCounts)])]) for game in range(games)]
+    standings=dict((strategy, [0, 0, 0]) for strategy in strategies)
+    
+    pool=startPool(workers)
+    try:
+        if pool is None: #we're on our own
+            records=imap(playTournamentGame, tasks)
+        else:
+            records=pool.imap(playTournamentGame, tasks)
+        for summary in records:
+            moves=summary.pop('moves')
+            output.write(json.dumps(summary, separators=(',', ':'))+'\n')
+            output.flush()
+            if record is not None:
+                writeGame(record, summary['players'], [decodeMove(code) for code in moves])
+            for player in range(summary['players']):
+                standing=standings[summary['strategies'][player]]
+                standing[0]+=1
+                standing[1]+=summary['scores'][player]==max(summary['scores'])
+                standing[2]+=summary['scores'][player]
+    finally:
+        stopPool(pool)
+    return standings
+
+def playTournamentGame(task):
+    """
+    playTournamentGame: tuple(str, int, int, list(str)) -> dict(str, object)
+    Plays a single game and returns its record: its number, deck seed, number of players, and strategies; each player's score, elimination, totalKills, totalHits, dangerousness, and move times in seconds, all indexed by player ID; and its moves, as encoded by encodeMove(...)
+        task - (package, game, seed, strategies), where package is the name of the player's package and strategies holds the argument for each seat
+    """
+    package, game, seed, strategies=task
+    player=__import__(package)
+    
+    chatter=sys.stdout
+    sys.stdout=open(os.devnull, 'w') #the players' game_over(...) statistics would drown out everything else
+    try:
+        result=playGame([player for _ in strategies], seed, strategies)
+    finally:
+        sys.stdout.close()
+        sys.stdout=chatter
+    
+    return {'game':game, 'seed':seed, 'players':len(strategies), 'strategies':strategies,
+            'scores':result.scores, 'eliminated':result.eliminated,
+            'kills':[getattr(data, 'totalKills', None) for data in result.playerData],
+            'hits':[getattr(data, 'totalHits', None) for data in result.playerData],
+            'dangerousness':[getattr(data, 'dangerousness', None) for data in result.playerData],
+            'moveTimes':[[round(seconds, 6) for seconds in times] for times in result.moveTimes],
+            'moves':[encodeMove(playerMove) for playerMove in result.moves]}
+
+def main(arguments):
+    """
+    main: list(str)
+    Runs a tournament as specified on the command line and prints each strategy's standings
+        arguments - the command-line arguments, less the program name
+    """
+    parser=ArgumentParser(description='Play our player against itself under different settings.')
+    parser.add_argument('--games', type=int, default=100, help='how many games to play')
+    parser.add_argument('--output', default='tournament.jsonl', help='the file to which to write each game\'s record')
+    parser.add_argument('--strategy', action='append', dest='strategies', help='an extra argument for init(...); repeat to pit several against each other')
+    parser.add_argument('--players', default='1,2,3,4,5,6', help='comma-separated numbers of players to seat, in rotation')
+    parser.add_argument('--workers', type=int, default=1, help='how many processes to play in')
+    parser.add_argument('--seed', type=int, default=0, help='the deck seed for the first game')
+    parser.add_argument('--record', help='a file in which to keep every game\'s moves, for replaying with the gameRecord module')
+    settings=parser.parse_args(arguments)
+    
+    record=None
+    if settings.record:
+        record=open(settings.record, 'wb')
+        startRecord(record)
+    try:
+        with open(settings.output, 'w') as output:
+            standings=runTournament(settings.games, output, settings.strategies or ['None'], [int(count) for count in settings.players.split(',')], settings.workers, settings.seed, record)
+    finally:
+        if record is not None:
+            record.close()
+    for strategy in sorted(standings, key=lambda strategy: standings[strategy][2]/float(max(standings[strategy][0], 1)), reverse=True):
+        played, won, score=standings[strategy]
+        print strategy+': '+str(won)+' of '+str(played)+' won, '+str(round(score/float(max(played, 1)), 1))+' points per game'
+
+if __name__=='__main__':
+    main(sys.argv[1:])